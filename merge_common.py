@@ -0,0 +1,145 @@
+"""
+Helper bersama halaman Merger Excel, Export Data dan Import Data.
+
+Dulu helper ini disalin di ketiga halaman; perubahan di satu
+halaman mudah tertinggal di halaman lain.
+"""
+import streamlit as st
+import pandas as pd
+from io import BytesIO
+from itertools import islice
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, Border, Side, Alignment
+
+
+# =========================
+# STREAMING EXCEL WRITER
+# =========================
+STREAM_CHUNK_ROWS = 10_000
+
+# Sama dengan style header bawaan pandas.to_excel
+HEADER_FONT = Font(bold=True)
+HEADER_BORDER = Border(
+    left=Side(style="thin"),
+    right=Side(style="thin"),
+    top=Side(style="thin"),
+    bottom=Side(style="thin"),
+)
+HEADER_ALIGNMENT = Alignment(horizontal="center", vertical="top")
+
+
+def write_excel_stream(df, output, sheet_name="Sheet1"):
+    """
+    Tulis dataframe ke xlsx baris per baris (openpyxl write-only),
+    sehingga memori tidak ikut membengkak untuk ratusan ribu baris.
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(sheet_name)
+
+    header = []
+    for col_name in df.columns:
+        cell = WriteOnlyCell(ws, value=col_name)
+        cell.font = HEADER_FONT
+        cell.border = HEADER_BORDER
+        cell.alignment = HEADER_ALIGNMENT
+        header.append(cell)
+    ws.append(header)
+
+    # Konversi ke objek Python per potongan, bukan sekaligus
+    for start in range(0, len(df), STREAM_CHUNK_ROWS):
+        chunk = df.iloc[start:start + STREAM_CHUNK_ROWS].astype(object)
+        chunk = chunk.where(chunk.notna(), None)
+
+        for record in chunk.itertuples(index=False, name=None):
+            ws.append(record)
+
+    wb.save(output)
+
+
+# =========================
+# PREVIEW (PER HALAMAN)
+# =========================
+PREVIEW_PAGE_SIZE = 100
+
+
+def read_preview_page(excel_bytes, page, sheet_name="Sheet1"):
+    """
+    Satu halaman baris dibaca ulang dari workbook hasil (read-only),
+    jadi data hasil merge tidak perlu disimpan utuh di session.
+    """
+    wb = load_workbook(BytesIO(excel_bytes), read_only=True)
+    rows = wb[sheet_name].iter_rows(values_only=True)
+
+    header = next(rows)
+    start = (page - 1) * PREVIEW_PAGE_SIZE
+    block = list(islice(rows, start, start + PREVIEW_PAGE_SIZE))
+    wb.close()
+
+    return pd.DataFrame(
+        block,
+        columns=header,
+        index=range(start, start + len(block))
+    )
+
+
+def merge_summary(df, upload_signature, excel_bytes, n_files):
+    """
+    Yang disimpan di session: bytes untuk download, ringkasan per file
+    dan halaman preview yang sedang tampil, bukan dataframe hasil merge.
+    """
+    return {
+        "files": upload_signature,
+        "excel": excel_bytes,
+        "n_files": n_files,
+        "n_rows": len(df),
+        "n_cols": len(df.columns),
+        "per_file": (
+            df.groupby("__source_file", sort=False)
+            .size()
+            .rename_axis("File")
+            .reset_index(name="Jumlah Baris")
+        ),
+        "page": 1,
+        "preview": df.iloc[:PREVIEW_PAGE_SIZE].copy(),
+    }
+
+
+def show_preview(result, key_name):
+    """
+    Ringkasan hasil merge + satu halaman baris,
+    sehingga yang dikirim ke browser tidak bertambah mengikuti ukuran data.
+    """
+    n_rows = result["n_rows"]
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Total Baris", f"{n_rows:,}")
+    col2.metric("Total Kolom", f"{result['n_cols']:,}")
+    col3.metric("Total File", f"{len(result['per_file']):,}")
+
+    st.write("Jumlah baris per file:")
+    st.dataframe(result["per_file"], hide_index=True)
+
+    n_pages = max(1, -(-n_rows // PREVIEW_PAGE_SIZE))
+
+    # Halaman lama bisa melebihi jumlah halaman hasil merge yang baru
+    page_key = f"{key_name}_page"
+    if st.session_state.get(page_key, 1) > n_pages:
+        st.session_state[page_key] = 1
+
+    page = st.number_input(
+        f"Halaman (dari {n_pages:,})",
+        min_value=1,
+        max_value=n_pages,
+        step=1,
+        key=page_key
+    )
+
+    # Hanya halaman yang tampil yang disimpan, halaman lain dibaca ulang
+    if result["page"] != page:
+        result["preview"] = read_preview_page(result["excel"], page)
+        result["page"] = page
+
+    start = (page - 1) * PREVIEW_PAGE_SIZE
+    st.caption(f"Baris {start + 1:,}–{min(start + PREVIEW_PAGE_SIZE, n_rows):,} dari {n_rows:,}")
+    st.dataframe(result["preview"])
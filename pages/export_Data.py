@@ -2,6 +2,8 @@ import streamlit as st
 import pandas as pd
 from io import BytesIO
 
+from merge_common import write_excel_stream, merge_summary, show_preview
+
 st.markdown(
     """
     <style>
@@ -13,6 +15,9 @@ st.markdown(
     unsafe_allow_html=True
 )
 
+
+RESULT_KEY = "export_result"
+
 st.title("Export Data - File Excel")
 
 # Upload multiple file
@@ -24,6 +29,8 @@ uploaded_files = st.file_uploader(
 
 if uploaded_files:
 
+    upload_signature = tuple(file.file_id for file in uploaded_files)
+
     if st.button("🔄 Proses Merge"):
 
         df_list = []
@@ -41,18 +48,37 @@ if uploaded_files:
 
             combined_df = pd.concat(df_list, ignore_index=True)
 
-            st.success(f"✅ Total file digabung: {len(df_list)}")
-            st.write("Preview Data:")
-            st.dataframe(combined_df)
-
             # Simpan ke memory buffer (bukan ke folder)
             output = BytesIO()
-            combined_df.to_excel(output, index=False, engine='openpyxl')
-            output.seek(0)
-
-            st.download_button(
-                label="📥 Download Hasil Merge",
-                data=output,
-                file_name="hasil_merge.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            write_excel_stream(combined_df, output)
+
+            # Ringkasan disimpan di session supaya ganti halaman preview
+            # tidak perlu merge ulang
+            st.session_state[RESULT_KEY] = merge_summary(
+                combined_df, upload_signature, output.getvalue(), len(df_list)
             )
+        else:
+            st.session_state.pop(RESULT_KEY, None)
+
+    result = st.session_state.get(RESULT_KEY)
+
+    # Hasil dari upload sebelumnya tidak dipakai lagi, lepaskan memorinya
+    if result and result["files"] != upload_signature:
+        st.session_state.pop(RESULT_KEY, None)
+        result = None
+
+    if result:
+
+        st.success(f"✅ Total file digabung: {result['n_files']}")
+        st.write("Preview Data:")
+        show_preview(result, RESULT_KEY)
+
+        st.download_button(
+            label="📥 Download Hasil Merge",
+            data=result["excel"],
+            file_name="hasil_merge.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        )
+
+else:
+    st.session_state.pop(RESULT_KEY, None)
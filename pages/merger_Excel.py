@@ -1,6 +1,10 @@
 import streamlit as st
 import pandas as pd
+import os
 from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor
+
+from merge_common import write_excel_stream, merge_summary, show_preview
 
 st.markdown(
     """
@@ -13,6 +17,9 @@ st.markdown(
     unsafe_allow_html=True
 )
 
+
+RESULT_KEY = "merger_result"
+
 st.title("Merger File Excel - Sheet1")
 
 # Upload multiple file
@@ -24,35 +31,66 @@ uploaded_files = st.file_uploader(
 
 if uploaded_files:
 
+    upload_signature = tuple(file.file_id for file in uploaded_files)
+
     if st.button("🔄 Proses Merge"):
 
         df_list = []
 
-        for file in uploaded_files:
-            try:
-                st.write(f"Membaca file: {file.name}")
-                df = pd.read_excel(file, sheet_name="Sheet1")
-                df["__source_file"] = file.name
-                df_list.append(df)
-            except Exception as e:
-                st.error(f"Gagal membaca {file.name}: {e}")
+        # Parse semua file paralel di process pool,
+        # hasil tetap diambil sesuai urutan upload
+        max_workers = min(len(uploaded_files), os.cpu_count() or 1)
+
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                (file, executor.submit(pd.read_excel, BytesIO(file.getvalue()), sheet_name="Sheet1"))
+                for file in uploaded_files
+            ]
+
+            for file, future in futures:
+                try:
+                    st.write(f"Membaca file: {file.name}")
+                    df = future.result()
+                    df["__source_file"] = file.name
+                    df_list.append(df)
+                except Exception as e:
+                    st.error(f"Gagal membaca {file.name}: {e}")
 
         if df_list:
 
             combined_df = pd.concat(df_list, ignore_index=True)
 
-            st.success(f"✅ Total file digabung: {len(df_list)}")
-            st.write("Preview Data:")
-            st.dataframe(combined_df)
-
             # Simpan ke memory buffer (bukan ke folder)
             output = BytesIO()
-            combined_df.to_excel(output, index=False, engine='openpyxl')
-            output.seek(0)
-
-            st.download_button(
-                label="📥 Download Hasil Merge",
-                data=output,
-                file_name="hasil_merge.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            write_excel_stream(combined_df, output)
+
+            # Ringkasan disimpan di session supaya ganti halaman preview
+            # tidak perlu merge ulang
+            st.session_state[RESULT_KEY] = merge_summary(
+                combined_df, upload_signature, output.getvalue(), len(df_list)
             )
+        else:
+            st.session_state.pop(RESULT_KEY, None)
+
+    result = st.session_state.get(RESULT_KEY)
+
+    # Hasil dari upload sebelumnya tidak dipakai lagi, lepaskan memorinya
+    if result and result["files"] != upload_signature:
+        st.session_state.pop(RESULT_KEY, None)
+        result = None
+
+    if result:
+
+        st.success(f"✅ Total file digabung: {result['n_files']}")
+        st.write("Preview Data:")
+        show_preview(result, RESULT_KEY)
+
+        st.download_button(
+            label="📥 Download Hasil Merge",
+            data=result["excel"],
+            file_name="hasil_merge.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        )
+
+else:
+    st.session_state.pop(RESULT_KEY, None)
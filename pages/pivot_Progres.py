@@ -2,18 +2,21 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import io
+import json
+import hashlib
 
 from st_aggrid import AgGrid, GridOptionsBuilder, GridUpdateMode
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.platypus import PageBreak
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib.pagesizes import A4, landscape
-from reportlab.lib.enums import TA_LEFT, TA_RIGHT, TA_CENTER
-from openpyxl.styles import Font, PatternFill, Border, Side, Alignment
-from openpyxl.utils import get_column_letter
+
+from progres_common import (
+    MASTER_SCHEMA,
+    count_distinct,
+    distinct_pairs,
+    read_master_sheet,
+    filter_index,
+    select_positions,
+    filter_fingerprint,
+)
+from progres_ui import filter_panel, download_section
 
 st.markdown(
     """
@@ -27,25 +30,17 @@ st.markdown(
 )
 
     
-# =========================
-# FORMAT NUMERIC FUNCTION
-# =========================
-def format_number(value):
-    if pd.isna(value):
-        return ""
-    if isinstance(value, (int, np.integer)):
-        return f"{value:,}"
-    if isinstance(value, (float, np.floating)):
-        return f"{value:,.2f}"
-    return str(value)
-
-
 # =========================
 # AGGRID FUNCTION
 # =========================
-def show_aggrid(df, key_name):
-
-    gb = GridOptionsBuilder.from_dataframe(df)
+@st.cache_data(max_entries=64, show_spinner=False)
+def grid_options(schema, _template):
+    """
+    schema    : (nama kolom, dtype) per kolom, kunci cache
+    _template : dataframe kosong dengan schema tersebut (tidak di-hash)
+    GridOptions hanya bergantung pada kolom, bukan isi data.
+    """
+    gb = GridOptionsBuilder.from_dataframe(_template)
 
     # Pagination
     gb.configure_pagination(
@@ -67,7 +62,7 @@ def show_aggrid(df, key_name):
     # Sidebar (filter & column selector)
     gb.configure_side_bar()
     
-    numeric_cols = df.select_dtypes(include=["int64", "float64"]).columns
+    numeric_cols = _template.select_dtypes(include="number").columns
 
     for col in numeric_cols:
         gb.configure_column(
@@ -77,15 +72,15 @@ def show_aggrid(df, key_name):
         )
 
     # Freeze kolom Kecamatan jika ada
-    if "Kecamatan" in df.columns:
+    if "Kecamatan" in _template.columns:
         gb.configure_column(
             "Kecamatan",
             pinned="left"
         )
     
     # Freeze kolom pertama (index 0)
-    if len(df.columns) > 0:
-        first_col = df.columns[0]
+    if len(_template.columns) > 0:
+        first_col = _template.columns[0]
 
         gb.configure_column(
             first_col,
@@ -98,11 +93,18 @@ def show_aggrid(df, key_name):
         enableRangeSelection=True
     )
 
-    grid_options = gb.build()
+    # Hasil builder berisi defaultdict lokal, simpan sebagai dict biasa
+    return json.loads(json.dumps(gb.build()))
+
+
+def show_aggrid(df, key_name):
+
+    schema = tuple((str(col), str(dtype)) for col, dtype in df.dtypes.items())
+    options = grid_options(schema, df.iloc[:0])
 
     AgGrid(
         df,
-        gridOptions=grid_options,
+        gridOptions=options,
         update_mode=GridUpdateMode.NO_UPDATE,
         fit_columns_on_grid_load=True,
         enable_enterprise_modules=False,
@@ -112,22 +114,32 @@ def show_aggrid(df, key_name):
     )
 
 
-
 # =========================
-# STREAMLIT UI
+# LOAD MASTER (CACHE)
 # =========================
-st.title("Pivot Progres SYNC DAPODIK")
-
-uploaded_file = st.file_uploader("Upload File Excel", type=["xlsx"])
+@st.cache_data(max_entries=8, show_spinner="Membaca sheet Master...")
+def load_master(file_hash, sheet_name, _file_bytes):
+    """
+    file_hash   : hash isi file upload (kunci cache)
+    sheet_name  : nama sheet yang dibaca
+    _file_bytes : isi file (tidak ikut di-hash oleh Streamlit)
+    """
+    return read_master_sheet(_file_bytes, sheet_name, MASTER_SCHEMA)
 
-if uploaded_file:
 
-    # =========================
-    # BACA FILE
-    # =========================
-    dapodik = pd.read_excel(uploaded_file, sheet_name="Master")
+# =========================
+# PERSIAPAN DATA PIVOT (CACHE)
+# =========================
+@st.cache_data(max_entries=8, show_spinner="Mengolah data...")
+def prepare_pivot(fingerprint, _dapodik):
+    """
+    fingerprint : hash data sumber (kunci cache)
+    _dapodik    : data Master (tidak ikut di-hash)
 
-    dapodik_filtered = dapodik.loc[~dapodik["BP"].isin(["SMA", "SMK", "SLB"])].copy()
+    Hasil : (data tanpa SMA/SMK/SLB + kolom pivot, index filter)
+    """
+    dapodik_filtered = _dapodik.loc[~_dapodik["BP"].isin(["SMA", "SMK", "SLB"])].copy()
+    dapodik_filtered["Kecamatan"] = dapodik_filtered["Kecamatan"].cat.remove_unused_categories()
     dapodik_filtered["GTK"] = (
             dapodik_filtered["Guru"] + dapodik_filtered["Tendik"]
         )
@@ -146,180 +158,259 @@ if uploaded_file:
         categories=["Negeri", "Swasta"],
         ordered=True
     )
-    
+
     dapodik_filtered["Sudah SYNC"] = (dapodik_filtered["Status_SYNC"] == "Sudah").astype(int)
     dapodik_filtered["Belum SYNC"] = (dapodik_filtered["Status_SYNC"] == "Belum").astype(int)
-    
+
     dapodik_filtered = dapodik_filtered.rename(columns={"NPSN": "SP"}, level=0)
-    
-    
-    # =========================
-    # FILTER JENJANG SMP
-    # =========================
-    dapodik_filtered_SMP = dapodik.loc[dapodik["BP"].isin(["SMP"])].copy()
-    
-    dapodik_filtered_SMP["Status_SYNC"] = dapodik_filtered_SMP["Last Sync"].apply(
-        lambda x: "Belum" if x == "Belum Kirim" else "Sudah"
+
+    # NPSN sebagai kode integer, dipakai untuk hitung SP unik
+    dapodik_filtered["SP_Kode"] = pd.factorize(dapodik_filtered["SP"])[0]
+
+    return dapodik_filtered, filter_index(dapodik_filtered)
+
+
+# =========================
+# CUBE KECAMATAN x BP x STATUS
+# =========================
+CUBE_KEYS = ["Kecamatan", "BP", "Status"]
+CUBE_SUMS = ["Sudah SYNC", "Belum SYNC", "PD", "Rombel", "Guru", "Tendik", "GTK"]
+
+# Sama dengan pivot_table lama (aggfunc "count"): kolom Sudah/Belum SYNC
+# di tabel pivot berisi jumlah baris, bukan jumlah yang sudah/belum SYNC
+CUBE_AGGFUNC = {"Sudah SYNC": "count", "Belum SYNC": "count"}
+
+
+def build_cube(rows):
+    """
+    Satu baris per (Kecamatan, BP, Status) berisi jumlah SP,
+    Sudah/Belum SYNC dan total PD/Rombel/Guru/Tendik/GTK.
+    """
+    grouped = rows.groupby(CUBE_KEYS, observed=True, dropna=False)
+
+    cube = (
+        grouped
+        .agg(**{col: (col, CUBE_AGGFUNC.get(col, "sum")) for col in CUBE_SUMS})
+        .reset_index()
     )
-    dapodik_filtered_SMP["GTK"] = (
-        dapodik_filtered_SMP["Guru"] + dapodik_filtered_SMP["Tendik"]
+
+    # SP = jumlah NPSN unik per sel, dihitung dari kode integer
+    cells, npsn = distinct_pairs(
+        grouped.ngroup().to_numpy(), rows["SP_Kode"].to_numpy()
     )
-    
-    dapodik_filtered_SMP["Status"] = pd.Categorical(
-        dapodik_filtered_SMP["Status"],
-        categories=["Negeri", "Swasta"],
-        ordered=True
+    cube.insert(len(CUBE_KEYS), "SP", np.bincount(cells, minlength=len(cube)))
+
+    # SP per sel hanya boleh dijumlahkan saat roll-up
+    # jika setiap NPSN tercatat di satu sel saja
+    sp_additive = not (np.bincount(npsn) > 1).any()
+
+    return cube, sp_additive
+
+
+def distinct_margins(rows, index, labels, statuses, mask):
+    """
+    SP unik untuk sel (index, Status), kolom Total, baris Total
+    dan grand total, langsung dari kode kategori + kode NPSN.
+    """
+    categories = rows[index].cat.categories
+    key_codes = rows[index].cat.codes.to_numpy().astype(np.int64)
+    status_codes = rows["Status"].cat.codes.to_numpy().astype(np.int64)
+    npsn_codes = rows["SP_Kode"].to_numpy()
+
+    n_keys, n_status = len(categories), len(statuses)
+    mask = mask & (key_codes >= 0) & (status_codes >= 0)
+
+    cells = count_distinct(key_codes * n_status + status_codes, n_keys * n_status, npsn_codes, mask)
+    cells = pd.DataFrame(cells.reshape(n_keys, n_status), index=categories, columns=statuses)
+
+    return (
+        cells.reindex(labels, fill_value=0),
+        pd.Series(count_distinct(key_codes, n_keys, npsn_codes, mask), index=categories)
+        .reindex(labels, fill_value=0),
+        pd.Series(count_distinct(status_codes, n_status, npsn_codes, mask), index=statuses),
+        count_distinct(np.zeros_like(key_codes), 1, npsn_codes, mask)[0],
     )
+
+
+def pivot_progres(cube, rows, sp_additive, index, values, jenjang=None):
+    """
+    Pivot per Status dengan kolom dan baris "Total" (bentuk sama dengan
+    pivot_table(margins=True)). Sel, kolom Total, baris Total dan grand
+    total dijumlahkan dari partial cube yang sama; SP yang tidak bisa
+    dijumlahkan dihitung dari kode NPSN.
+    """
+    part = cube
+    if jenjang is not None:
+        part = cube.loc[cube["BP"] == jenjang].copy()
+        part["Kecamatan"] = part["Kecamatan"].cat.remove_unused_categories()
+
+    labels = part[index].cat.categories
+    statuses = part["Status"].cat.categories
+
+    # Seperti pivot_table: baris dengan index / Status kosong tidak dihitung
+    part = part.loc[part[index].notna() & part["Status"].notna()]
+
+    cells = part.groupby([index, "Status"], observed=False)[values].sum()
+    col_total = part.groupby(index, observed=False)[values].sum()
+    row_total = part.groupby("Status", observed=False)[values].sum()
+    grand_total = part[values].sum()
+
+    sp = None
+    if "SP" in values and not sp_additive:
+        mask = np.ones(len(rows), dtype=bool)
+        if jenjang is not None:
+            mask = (rows["BP"] == jenjang).to_numpy()
+        sp = distinct_margins(rows, index, labels, statuses, mask)
+
+    table = {}
+    for col in values:
+        if col == "SP" and sp is not None:
+            sp_cells, sp_col_total, sp_row_total, sp_grand_total = sp
+            for status in statuses:
+                table[(col, status)] = [*sp_cells[status], sp_row_total[status]]
+            table[(col, "Total")] = [*sp_col_total, sp_grand_total]
+            continue
+
+        # Mask level Status (bukan xs): aman jika slice jenjang kosong
+        cell_status = cells.index.get_level_values("Status")
+        for status in statuses:
+            table[(col, status)] = [
+                *cells[col][cell_status == status].droplevel("Status").reindex(labels, fill_value=0),
+                row_total.loc[status, col]
+            ]
+        table[(col, "Total")] = [*col_total[col].reindex(labels, fill_value=0), grand_total[col]]
+
+    result = pd.DataFrame(table, index=pd.Index([*labels, "Total"], name=index))
+    result.columns = result.columns.set_names([None, "Status"])
+
+    return result
+
+
+def sync_by_kecamatan(rows):
+    """
+    Kernel bersama untuk KPI, grafik dan ranking.
+    Per Kecamatan: SP unik, SP unik sudah SYNC dan belum SYNC.
+    Total: SP unik keseluruhan dan jumlah baris sudah SYNC.
+    """
+    kecamatan = rows["Kecamatan"].cat.categories
+    kec_codes = rows["Kecamatan"].cat.codes.to_numpy()
+    npsn_codes = rows["SP_Kode"].to_numpy()
+    sudah = rows["Sudah SYNC"].to_numpy() == 1
+    belum = rows["Belum SYNC"].to_numpy() == 1
+
+    n_kec = len(kecamatan)
+    observed = np.bincount(kec_codes[kec_codes >= 0], minlength=n_kec) > 0
+
+    per_kec = pd.DataFrame(
+        {
+            "SP": count_distinct(kec_codes, n_kec, npsn_codes),
+            "Sudah SYNC": count_distinct(kec_codes, n_kec, npsn_codes, sudah),
+            "Belum SYNC": count_distinct(kec_codes, n_kec, npsn_codes, belum),
+        },
+        index=pd.CategoricalIndex(kecamatan, categories=kecamatan, name="Kecamatan")
+    )[observed]
+
+    total = {
+        "SP": int(count_distinct(np.zeros_like(kec_codes), 1, npsn_codes)[0]),
+        "Sudah SYNC": int(sudah.sum()),
+    }
+
+    return per_kec, total
+
+
+# =========================
+# STREAMLIT UI
+# =========================
+st.title("Pivot Progres SYNC DAPODIK")
+
+uploaded_file = st.file_uploader("Upload File Excel", type=["xlsx"])
+
+if uploaded_file:
+
+    # =========================
+    # BACA FILE
+    # =========================
+    # Rerun dengan file yang sama tidak mem-parse ulang workbook
+    file_bytes = uploaded_file.getvalue()
+    file_hash = hashlib.sha256(file_bytes).hexdigest()
+
+    dapodik = load_master(file_hash, "Master", file_bytes)
+
+    # Data pivot + index filter di-cache per file
+    dapodik_filtered, index = prepare_pivot(file_hash, dapodik)
+
+    # =========================
+    # FILTER
+    # =========================
+    # Filter = irisan index posisi baris, lalu agregasi ulang baris terpilih
+    selection = filter_panel(index)
+    fingerprint = filter_fingerprint(file_hash, selection)
+    positions = select_positions(index, selection)
+
+    if positions is not None:
+        dapodik_filtered = dapodik_filtered.take(positions)
+        dapodik_filtered["Kecamatan"] = dapodik_filtered["Kecamatan"].cat.remove_unused_categories()
+
+    if dapodik_filtered.empty:
+        st.warning("Tidak ada data yang sesuai dengan filter.")
+        st.stop()
     
-    dapodik_filtered_SMP["Sudah SYNC"] = (dapodik_filtered_SMP["Status_SYNC"] == "Sudah").astype(int)
-    dapodik_filtered_SMP["Belum SYNC"] = (dapodik_filtered_SMP["Status_SYNC"] == "Belum").astype(int)
-    
-    dapodik_filtered_SMP = dapodik_filtered_SMP.rename(columns={"NPSN": "SP"}, level=0)
     
+    # =========================
+    # CUBE KECAMATAN x BP x STATUS
+    # =========================
+    cube, sp_additive = build_cube(dapodik_filtered)
+
     # =========================
     # PIVOT
     # =========================
-    per_kec = dapodik_filtered.pivot_table(
-        values=["SP", "Sudah SYNC", "Belum SYNC", "PD", "Rombel", "Guru", "Tendik", "GTK"], 
-        index="Kecamatan", 
-        columns="Status", 
-        aggfunc={
-            "SP" : "nunique", 
-            "Sudah SYNC" : "count",
-            "Belum SYNC" : "count",
-            "PD" : "sum", 
-            "Rombel" : "sum",
-            "Guru" : "sum",
-            "Tendik" : "sum",
-            "GTK" : "sum"
-        }, 
-        fill_value=0, 
-        margins=True, 
-        margins_name="Total", 
-        observed=False
+    per_kec = pivot_progres(
+        cube, dapodik_filtered, sp_additive, "Kecamatan",
+        ["SP", "Sudah SYNC", "Belum SYNC", "PD", "Rombel", "Guru", "Tendik", "GTK"]
+    )
+
+    per_kec_NS = pivot_progres(
+        cube, dapodik_filtered, sp_additive, "Kecamatan",
+        ["SP", "PD", "Rombel", "Guru", "Tendik", "GTK"]
+    )
+
+    per_bp_NS = pivot_progres(
+        cube, dapodik_filtered, sp_additive, "BP",
+        ["SP", "PD", "Rombel", "Guru", "Tendik", "GTK"]
     )
-    
-    per_kec_NS = dapodik_filtered.pivot_table(
-        values=["SP", "PD", "Rombel", "Guru", "Tendik", "GTK"], 
-        index=["Kecamatan"], 
-        columns=["Status"], 
-        aggfunc={
-            "SP" : "nunique", 
-            "PD" : "sum", 
-            "Rombel" : "sum",
-            "Guru" : "sum",
-            "Tendik" : "sum",
-            "GTK" : "sum"
-        }, 
-        fill_value=0, 
-        margins=True,
-        margins_name="Total", 
-        observed=False
-        )
 
-    per_bp_NS = dapodik_filtered.pivot_table(
-        values=["SP", "PD", "Rombel", "Guru", "Tendik", "GTK"], 
-        index=["BP"], 
-        columns=["Status"], 
-        aggfunc={
-            "SP" : "nunique",
-            "PD" : "sum", 
-            "Rombel" : "sum",
-            "Guru" : "sum",
-            "Tendik" : "sum",
-            "GTK" : "sum"
-        }, 
-        fill_value=0, 
-        margins=True,
-        margins_name="Total", 
-        observed=False
-        )
-    
     # =========================
     # PIVOT JENJANG SMP
     # =========================
-    
-    per_kec_SMP = dapodik_filtered_SMP.pivot_table(
-        values=["SP", "Sudah SYNC", "Belum SYNC", "PD", "Rombel", "Guru", "Tendik", "GTK"], 
-        index=["Kecamatan"],
-        columns=["Status"], 
-        aggfunc={
-            "SP" : "nunique", 
-            "Sudah SYNC" : "count", 
-            "Belum SYNC" : "count", 
-            "PD" : "sum", 
-            "Rombel" : "sum",
-            "Guru" : "sum",
-            "Tendik" : "sum",
-            "GTK" : "sum"
-        }, 
-        fill_value=0, 
-        margins=True,
-        margins_name="Total", 
-        observed=False
-        )
+    per_kec_SMP = pivot_progres(
+        cube, dapodik_filtered, sp_additive, "Kecamatan",
+        ["SP", "Sudah SYNC", "Belum SYNC", "PD", "Rombel", "Guru", "Tendik", "GTK"],
+        jenjang="SMP"
+    )
 
-    per_kec_SP_SMP = dapodik_filtered_SMP.pivot_table(
-        values=["SP", "Sudah SYNC", "Belum SYNC"], 
-        index=["Kecamatan"],
-        columns=["Status"], 
-        aggfunc={
-            "SP" : "nunique", 
-            "Sudah SYNC" : "count", 
-            "Belum SYNC" : "count"
-        }, 
-        fill_value=0, 
-        margins=True,
-        margins_name="Total", 
-        observed=False
-        )
-    
-    per_kec_PDRombel_SMP = dapodik_filtered_SMP.pivot_table(
-        values=["PD", "Rombel"], 
-        index=["Kecamatan"],
-        columns=["Status"], 
-        aggfunc={
-            "PD" : "sum", 
-            "Rombel" : "sum"
-        }, 
-        fill_value=0, 
-        margins=True,
-        margins_name="Total", 
-        observed=False
-        )
-    
-    per_kec_GTK_SMP = dapodik_filtered_SMP.pivot_table(
-        values=["Guru", "Tendik", "GTK"], 
-        index=["Kecamatan"],
-        columns=["Status"], 
-        aggfunc={
-            "Guru" : "sum",
-            "Tendik" : "sum",
-            "GTK" : "sum"
-        }, 
-        fill_value=0, 
-        margins=True,
-        margins_name="Total", 
-        observed=False
-        )
+    per_kec_SP_SMP = pivot_progres(
+        cube, dapodik_filtered, sp_additive, "Kecamatan",
+        ["SP", "Sudah SYNC", "Belum SYNC"],
+        jenjang="SMP"
+    )
 
-    per_kec_ALL_SMP = dapodik_filtered_SMP.pivot_table(
-        values=["SP", "PD", "Rombel", "Guru", "Tendik", "GTK"], 
-        index=["Kecamatan"],
-        columns=["Status"], 
-        aggfunc={
-            "SP" : "nunique",
-            "PD" : "sum", 
-            "Rombel" : "sum",
-            "Guru" : "sum",
-            "Tendik" : "sum",
-            "GTK" : "sum"
-        }, 
-        fill_value=0, 
-        margins=True,
-        margins_name="Total", 
-        observed=False
-        )
+    per_kec_PDRombel_SMP = pivot_progres(
+        cube, dapodik_filtered, sp_additive, "Kecamatan",
+        ["PD", "Rombel"],
+        jenjang="SMP"
+    )
+
+    per_kec_GTK_SMP = pivot_progres(
+        cube, dapodik_filtered, sp_additive, "Kecamatan",
+        ["Guru", "Tendik", "GTK"],
+        jenjang="SMP"
+    )
+
+    per_kec_ALL_SMP = pivot_progres(
+        cube, dapodik_filtered, sp_additive, "Kecamatan",
+        ["SP", "PD", "Rombel", "Guru", "Tendik", "GTK"],
+        jenjang="SMP"
+    )
 
     st.success("Data berhasil diproses!")
     
@@ -330,9 +421,12 @@ if uploaded_file:
     # KPI DASHBOARD
     # =========================
 
-    total_sp = dapodik_filtered["SP"].nunique()
+    # KPI, grafik dan ranking memakai satu kernel yang sama
+    sync_kec, sync_total = sync_by_kecamatan(dapodik_filtered)
+
+    total_sp = sync_total["SP"]
     
-    total_sudah = dapodik_filtered["Sudah SYNC"].sum()
+    total_sudah = sync_total["Sudah SYNC"]
 
     total_belum = total_sp - total_sudah
 
@@ -351,32 +445,8 @@ if uploaded_file:
 
     st.subheader("📊 Grafik Progres SYNC per Kecamatan")
 
-    chart_data = (
-        dapodik_filtered
-        .groupby("Kecamatan")
-        .agg({
-            "SP": "nunique",
-            "Sudah SYNC": "sum",
-            "Belum SYNC": "sum"
-        })
-    )
-
-    # Hindari double count jika ada duplikasi NPSN
-    chart_data["Sudah SYNC"] = (
-        dapodik_filtered
-        .loc[dapodik_filtered["Sudah SYNC"] == 1]
-        .groupby("Kecamatan")["SP"]
-        .nunique()
-    )
-
-    chart_data["Belum SYNC"] = (
-        dapodik_filtered
-        .loc[dapodik_filtered["Belum SYNC"] == 1]
-        .groupby("Kecamatan")["SP"]
-        .nunique()
-    )
-
-    chart_data = chart_data.fillna(0).astype(int)
+    # SP unik per status SYNC (hindari double count jika ada duplikasi NPSN)
+    chart_data = sync_kec
 
     st.bar_chart(chart_data[["Sudah SYNC", "Belum SYNC"]])
     
@@ -385,12 +455,8 @@ if uploaded_file:
     # =========================
 
     ranking = (
-        dapodik_filtered
-        .groupby("Kecamatan")
-        .apply(lambda df: pd.Series({
-            "Total_SP": df["SP"].nunique(),
-            "Total_Sudah": df.loc[df["Belum SYNC"] == 0, "SP"].nunique()
-        }))
+        sync_kec[["SP", "Sudah SYNC"]]
+        .rename(columns={"SP": "Total_SP", "Sudah SYNC": "Total_Sudah"})
         .reset_index()
     )
 
@@ -557,20 +623,24 @@ if uploaded_file:
     )
 
 
+    # Hanya grid di tab yang sedang dibuka yang dibangun dan dikirim
     tab1, tab2, tab3 = st.tabs([
         "📊 Rekap Per Kecamatan",
         "🏫 Rekap Negeri/Swasta Per Kecamatan",
         "📌 Rekap Negeri/Swasta Per BP"
-    ])
+    ], key="tabs_rekap_master", on_change="rerun")
 
     with tab1:
-        show_aggrid(per_kec, "grid_kec")
+        if tab1.open:
+            show_aggrid(per_kec, "grid_kec")
 
     with tab2:
-        show_aggrid(per_kec_NS, "grid_kec_ns")
+        if tab2.open:
+            show_aggrid(per_kec_NS, "grid_kec_ns")
 
     with tab3:
-        show_aggrid(per_bp_NS, "grid_bp_ns")
+        if tab3.open:
+            show_aggrid(per_bp_NS, "grid_bp_ns")
 
 
     tab_smp_1, tab_smp_2, tab_smp_3, tab_smp_4, tab_smp_5 = st.tabs([
@@ -579,169 +649,27 @@ if uploaded_file:
         "📌 PD dan Rombel SMP",
         "📌 Progres GTK SMP",
         "📌 ALL DAPODIK SMP"
-    ])
+    ], key="tabs_eksplorasi_smp", on_change="rerun")
 
     with tab_smp_1:
-        show_aggrid(per_kec_SMP, "grid_kec_smp")
+        if tab_smp_1.open:
+            show_aggrid(per_kec_SMP, "grid_kec_smp")
 
     with tab_smp_2:
-        show_aggrid(per_kec_SP_SMP, "grid_kec_sp_smp")
+        if tab_smp_2.open:
+            show_aggrid(per_kec_SP_SMP, "grid_kec_sp_smp")
 
     with tab_smp_3:
-        show_aggrid(per_kec_PDRombel_SMP, "grid_kec_pdrombel_smp")
+        if tab_smp_3.open:
+            show_aggrid(per_kec_PDRombel_SMP, "grid_kec_pdrombel_smp")
 
     with tab_smp_4:
-        show_aggrid(per_kec_GTK_SMP, "grid_kec_gtk_smp")
+        if tab_smp_4.open:
+            show_aggrid(per_kec_GTK_SMP, "grid_kec_gtk_smp")
 
     with tab_smp_5:
-        show_aggrid(per_kec_ALL_SMP, "grid_kec_all_smp")
-
-
-    # =========================================
-    # GLOBAL STYLE CONFIG
-    # =========================================
-    HEADER_FILL = PatternFill("solid", fgColor="1F4E78")
-    HEADER_FONT = Font(color="FFFFFF", bold=True)
-    TITLE_FONT = Font(size=14, bold=True)
-    TOTAL_FILL = PatternFill("solid", fgColor="FFF2CC")
-    THIN_BORDER = Border(
-        left=Side(style="thin"),
-        right=Side(style="thin"),
-        top=Side(style="thin"),
-        bottom=Side(style="thin"),
-    )
-    NUMBER_FORMAT_INTEGER = '#,##0'
-    NUMBER_FORMAT_DECIMAL = '#,##0.00'
-    NUMBER_FORMAT_PERCENT = '0.00%'
-
-
-    # =========================================
-    # STYLE TABLE FUNCTION
-    # =========================================
-    def style_table(ws, start_row, df, title=None):
-        """
-        start_row : baris pertama tabel (1-based Excel)
-        df        : dataframe
-        """
-
-        n_cols = len(df.columns)
-        header_row = start_row
-        data_start = header_row + 1
-        data_end = data_start + len(df) - 1
-        total_row = data_end
-
-        # =========================
-        # TITLE
-        # =========================
-        if title:
-            ws.insert_rows(start_row)
-            ws.cell(row=start_row, column=1, value=title)
-            ws.cell(row=start_row, column=1).font = TITLE_FONT
-            ws.merge_cells(
-                start_row=start_row,
-                start_column=1,
-                end_row=start_row,
-                end_column=n_cols
-            )
-            header_row += 1
-            data_start += 1
-            data_end += 1
-            total_row += 1
-
-        # =========================
-        # HEADER STYLE
-        # =========================
-        for col in range(1, n_cols + 1):
-            cell = ws.cell(row=header_row, column=col)
-            cell.fill = HEADER_FILL
-            cell.font = HEADER_FONT
-            cell.alignment = Alignment(horizontal="center", vertical="center")
-            cell.border = THIN_BORDER
-
-        # =========================
-        # DATA + TOTAL STYLE
-        # =========================
-        for row in ws.iter_rows(
-            min_row=data_start,
-            max_row=data_end,
-            min_col=1,
-            max_col=n_cols
-            
-        ):
-            for i, cell in enumerate(row):
-                col_name = df.columns[i]
-                
-                cell.border = THIN_BORDER                
-                
-                if i == 0:
-                    cell.alignment = Alignment(horizontal="left")
-                else:
-                    cell.alignment = Alignment(horizontal="right")
-                
-                # =========================
-                # FORMAT NUMERIC OTOMATIS
-                # =========================
-                if pd.api.types.is_integer_dtype(df[col_name]):
-                    cell.number_format = NUMBER_FORMAT_INTEGER
-
-                elif pd.api.types.is_float_dtype(df[col_name]):
-
-                    # Jika kolom persentase
-                    if "%" in col_name.lower() or "persen" in col_name.lower():
-                        cell.number_format = NUMBER_FORMAT_PERCENT
-                    else:
-                        cell.number_format = NUMBER_FORMAT_DECIMAL
-
-        # Highlight TOTAL row
-        for col in range(1, n_cols + 1):
-            cell = ws.cell(row=total_row, column=col)
-            cell.fill = TOTAL_FILL
-            cell.font = Font(bold=True)
-
-
-        # =========================
-        # AUTO WIDTH (Only Table Range)
-        # =========================
-        for col in range(1, n_cols + 1):
-            column_letter = get_column_letter(col)
-            max_len = 0
-
-            for row in range(header_row, data_end + 1):
-                value = ws.cell(row=row, column=col).value
-                if value:
-                    max_len = max(max_len, len(str(value)))
-
-            ws.column_dimensions[column_letter].width = max_len + 3
-
-
-    # =========================================
-    # WRITE MULTIPLE TABLES
-    # =========================================
-    def write_tables(writer, sheet_name, tables, spacing=4):
-
-        ws = writer.book.create_sheet(sheet_name)
-        writer.sheets[sheet_name] = ws
-
-        current_row = 1
-
-        for df, title in tables:
-
-            df.to_excel(
-                writer,
-                sheet_name=sheet_name,
-                index=False,
-                startrow=current_row - 1
-            )
-
-            style_table(
-                ws=ws,
-                start_row=current_row,
-                df=df,
-                title=title
-            )
-
-            # Update posisi berikutnya
-            current_row += len(df) + spacing + 2
+        if tab_smp_5.open:
+            show_aggrid(per_kec_ALL_SMP, "grid_kec_all_smp")
 
 
     def flatten_columns(df):
@@ -815,135 +743,16 @@ if uploaded_file:
         )
     }
 
-    excel_buffer = io.BytesIO()
-
-    with pd.ExcelWriter(excel_buffer, engine="openpyxl") as writer:
-
-        write_tables(
-            writer,
-            "Rekap_Master",
-            [(select_columns(df, cols), title)
-            for title, (df, cols) in master_exports.items()]
-        )
-
-        write_tables(
-            writer,
-            "Eksplorasi_SMP",
-            [(select_columns(df, cols), title)
-            for title, (df, cols) in smp_exports.items()]
-        )
-
-    excel_buffer.seek(0)
-
-
-    # =========================
-    # EXPORT PDF (IN MEMORY)
-    # =========================
-    pdf_buffer = io.BytesIO()
-
-    doc = SimpleDocTemplate(
-        pdf_buffer,
-        pagesize=landscape(A4),
-        leftMargin=1 * inch,
-        rightMargin=0.8 * inch,
-        topMargin=0.8 * inch,
-        bottomMargin=0.8 * inch
-    )
-
-    elements = []
-    styles = getSampleStyleSheet()
-
-
-    # =========================
-    # STYLE
-    # =========================
-    cell_left = ParagraphStyle(
-        name='cell_left',
-        parent=styles['Normal'],
-        fontSize=8,
-        alignment=TA_LEFT
-    )
-
-    cell_right = ParagraphStyle(
-        name='cell_right',
-        parent=styles['Normal'],
-        fontSize=8,
-        alignment=TA_RIGHT
-    )
-
-    header_style = ParagraphStyle(
-        name='header_style',
-        parent=styles['Normal'],
-        fontName='Helvetica-Bold',
-        fontSize=8,
-        textColor=colors.white,
-        alignment=TA_CENTER
-    )
-
-    def build_pdf_table(elements, df, title, doc, styles,
-                    header_style, cell_left, cell_right,
-                    format_number,
-                    landscape_mode=True,
-                    add_page_break=True):
-
-        # Optional title
-        if title:
-            elements.append(Paragraph(title, styles["Title"]))
-            elements.append(Spacer(1, 12))
-
-        # =====================
-        # Build Data
-        # =====================
-        data = []
-
-        # Header
-        data.append([
-            Paragraph(str(col), header_style)
-            for col in df.columns
-        ])
-
-        # Rows
-        for _, row in df.iterrows():
-            row_data = [
-                Paragraph(str(value), cell_left) if i == 0
-                else Paragraph(format_number(value), cell_right)
-                for i, value in enumerate(row)
-            ]
-            data.append(row_data)
-
-        # =====================
-        # Column Width
-        # =====================
-        if landscape_mode:
-            page_width, _ = landscape(A4)
-        else:
-            page_width, _ = A4
-
-        usable_width = page_width - doc.leftMargin - doc.rightMargin
-        num_cols = len(df.columns)
-
-        ratio = [2.5] + [1] * (num_cols - 1)
-        total_ratio = sum(ratio)
-
-        col_widths = [(r / total_ratio) * usable_width for r in ratio]
-
-        # =====================
-        # Create Table
-        # =====================
-        table = Table(data, colWidths=col_widths, repeatRows=1)
-
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ]))
-
-        elements.append(table)
-        elements.append(Spacer(1, 24))
-
-        if add_page_break:
-            elements.append(PageBreak())
+    excel_sheets = {
+        "Rekap_Master": [
+            (select_columns(df, cols), title)
+            for title, (df, cols) in master_exports.items()
+        ],
+        "Eksplorasi_SMP": [
+            (select_columns(df, cols), title)
+            for title, (df, cols) in smp_exports.items()
+        ],
+    }
 
     # =========================
     # BUILD ALL TABLES
@@ -960,54 +769,15 @@ if uploaded_file:
         (per_kec_ALL_SMP, "Eksplorasi Progres ALL DAPODIK SMP per Kecamatan"),
     ]
 
-    for i, (df, title) in enumerate(tables_config):
-
-        build_pdf_table(
-            elements=elements,
-            df=df,
-            title=title,
-            doc=doc,
-            styles=styles,
-            header_style=header_style,
-            cell_left=cell_left,
-            cell_right=cell_right,
-            format_number=format_number,
-            add_page_break=(i < len(tables_config) - 1)  # No page break at last table
-        )
-
-    # =========================
-    # BUILD PDF
-    # =========================
-    doc.build(elements)
-
-    # Reset buffer posisi ke awal
-    pdf_buffer.seek(0)
-    excel_buffer.seek(0)
+    # Sidik konfigurasi laporan, ikut menjadi kunci artifact cache
+    report_layout = hashlib.sha256(repr((
+        [(title, cols) for title, (_, cols) in master_exports.items()],
+        [(title, cols) for title, (_, cols) in smp_exports.items()],
+        [title for _, title in tables_config],
+    )).encode()).hexdigest()[:16]
 
     # =========================
     # DOWNLOAD SECTION
     # =========================
-    st.markdown("### 📥 Download Laporan")
-
-    with st.container():
-
-        col1, col2 = st.columns(2)
-
-        with col1:
-            st.download_button(
-                label="📊 Download Excel",
-                data=excel_buffer,
-                file_name="Rekap_Progres_SYNC_DAPODIK.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                use_container_width=True
-            )
-
-        with col2:
-            st.download_button(
-                label="📄 Download PDF",
-                data=pdf_buffer,
-                file_name="Rekap_Progres_SYNC_DAPODIK.pdf",
-                mime="application/pdf",
-                use_container_width=True
-            )
-
+    # Excel dan PDF dirender di process pool saat laporan diminta
+    download_section(fingerprint, report_layout, excel_sheets, tables_config)
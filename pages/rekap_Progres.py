@@ -1,18 +1,41 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-import io
+import json
+import os
+import re
+import hashlib
+import tempfile
+import zipfile
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+from pathlib import Path
 
 from st_aggrid import AgGrid, GridOptionsBuilder, GridUpdateMode
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.platypus import PageBreak
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib.pagesizes import A4, landscape
-from reportlab.lib.enums import TA_LEFT, TA_RIGHT, TA_CENTER
-from openpyxl.styles import Font, PatternFill, Border, Side, Alignment
-from openpyxl.utils import get_column_letter
+
+from rekap_report import (
+    REPORT_SPECS,
+    REPORT_SHEETS,
+    REPORT_LAYOUT,
+    aggregate_tables,
+    materialize_reports,
+    report_tables,
+    render_kecamatan_report,
+)
+from progres_common import (
+    MASTER_SCHEMA,
+    read_master_sheet,
+    filter_index,
+    select_positions,
+    filter_fingerprint,
+)
+from progres_ui import filter_panel, download_section
+
+# pyarrow opsional, hanya dipakai untuk snapshot parquet
+try:
+    from pyarrow import ArrowException
+except ImportError:
+    ArrowException = ValueError
 
 st.markdown(
     """
@@ -26,25 +49,17 @@ st.markdown(
 )
 
     
-# =========================
-# FORMAT NUMERIC FUNCTION
-# =========================
-def format_number(value):
-    if pd.isna(value):
-        return ""
-    if isinstance(value, (int, np.integer)):
-        return f"{value:,}"
-    if isinstance(value, (float, np.floating)):
-        return f"{value:,.2f}"
-    return str(value)
-
-
 # =========================
 # AGGRID FUNCTION
 # =========================
-def show_aggrid(df, key_name):
-
-    gb = GridOptionsBuilder.from_dataframe(df)
+@st.cache_data(max_entries=64, show_spinner=False)
+def grid_options(schema, _template):
+    """
+    schema    : (nama kolom, dtype) per kolom, kunci cache
+    _template : dataframe kosong dengan schema tersebut (tidak di-hash)
+    GridOptions hanya bergantung pada kolom, bukan isi data.
+    """
+    gb = GridOptionsBuilder.from_dataframe(_template)
 
     # Pagination
     gb.configure_pagination(
@@ -63,7 +78,7 @@ def show_aggrid(df, key_name):
     # Sidebar (filter & column selector)
     gb.configure_side_bar()
     
-    numeric_cols = df.select_dtypes(include=["int64", "float64"]).columns
+    numeric_cols = _template.select_dtypes(include="number").columns
 
     for col in numeric_cols:
         gb.configure_column(
@@ -73,15 +88,15 @@ def show_aggrid(df, key_name):
         )
 
     # Freeze kolom Kecamatan jika ada
-    if "Kecamatan" in df.columns:
+    if "Kecamatan" in _template.columns:
         gb.configure_column(
             "Kecamatan",
             pinned="left"
         )
     
     # Freeze kolom pertama (index 0)
-    if len(df.columns) > 0:
-        first_col = df.columns[0]
+    if len(_template.columns) > 0:
+        first_col = _template.columns[0]
 
         gb.configure_column(
             first_col,
@@ -94,11 +109,18 @@ def show_aggrid(df, key_name):
         enableRangeSelection=True
     )
 
-    grid_options = gb.build()
+    # Hasil builder berisi defaultdict lokal, simpan sebagai dict biasa
+    return json.loads(json.dumps(gb.build()))
+
+
+def show_aggrid(df, key_name):
+
+    schema = tuple((str(col), str(dtype)) for col, dtype in df.dtypes.items())
+    options = grid_options(schema, df.iloc[:0])
 
     AgGrid(
         df,
-        gridOptions=grid_options,
+        gridOptions=options,
         update_mode=GridUpdateMode.NO_UPDATE,
         fit_columns_on_grid_load=True,
         theme="streamlit",
@@ -107,317 +129,208 @@ def show_aggrid(df, key_name):
     )
 
 
-
 # =========================
-# STREAMLIT UI
+# NORMALISASI KATEGORI
 # =========================
-st.title("Rekap Progres SYNC DAPODIK")
+def normalize_category(series, case="upper"):
+    """
+    Strip + upper/lower cukup dilakukan pada daftar kategori,
+    lalu kode tiap baris dipetakan ke kategori hasil normalisasi.
+    """
+    # Kode -1 (NaN) mengambil label terakhir "nan", sama seperti astype(str)
+    labels = pd.Index(list(series.cat.categories.astype(str)) + ["nan"]).str.strip()
+    labels = labels.str.upper() if case == "upper" else labels.str.lower()
 
-uploaded_file = st.file_uploader("Upload File Excel", type=["xlsx"])
+    label_codes, categories = pd.factorize(labels, sort=True)
+    codes = label_codes[series.cat.codes.to_numpy()]
 
-if uploaded_file:
+    return pd.Series(
+        pd.Categorical.from_codes(codes, categories),
+        index=series.index
+    ).cat.remove_unused_categories()
 
-    # =========================
-    # BACA FILE
-    # =========================
-    dapodik = pd.read_excel(uploaded_file, sheet_name="Master")
 
-    dapodik["BP"] = dapodik["BP"].astype(str).str.strip().str.upper()
-    dapodik["Status"] = dapodik["Status"].astype(str).str.strip().str.upper()
+# =========================
+# LOAD MASTER (CACHE)
+# =========================
+@st.cache_data(max_entries=8, show_spinner="Membaca sheet Master...")
+def load_master(file_hash, sheet_name, _file_bytes):
+    """
+    file_hash   : hash isi file upload (kunci cache)
+    sheet_name  : nama sheet yang dibaca
+    _file_bytes : isi file (tidak ikut di-hash oleh Streamlit)
+    """
+    dapodik = read_master_sheet(_file_bytes, sheet_name, MASTER_SCHEMA)
+
+    dapodik["BP"] = normalize_category(dapodik["BP"], "upper")
+    dapodik["Status"] = normalize_category(dapodik["Status"], "upper")
     dapodik["Last Sync"] = dapodik["Last Sync"].astype(str).str.strip().str.lower()
 
-    dapodik_filtered = dapodik.loc[~dapodik["BP"].isin(["SMA", "SMK", "SLB"])].copy()
-    dapodik_filtered_SMP = dapodik.loc[dapodik["BP"].isin(["SMP"])].copy()
+    return dapodik
 
-    dapodik_filtered["Status_SYNC"] = dapodik_filtered["Last Sync"].apply(
-        lambda x: "Belum" if x == "belum kirim" else "Sudah"
-    )
-    dapodik_filtered_SMP["Status_SYNC"] = dapodik_filtered_SMP["Last Sync"].apply(
-        lambda x: "Belum" if x == "belum kirim" else "Sudah"
-    )
+
+# =========================
+# SNAPSHOT MASTER (PARQUET)
+# =========================
+SNAPSHOT_DIR = Path("snapshots")
+
+
+def save_snapshot(df, upload_date, file_hash):
+    """
+    Simpan dapodik yang sudah dinormalisasi sebagai file parquet,
+    diberi tag tanggal upload dan hash file asal.
+    """
+    SNAPSHOT_DIR.mkdir(exist_ok=True)
+    path = SNAPSHOT_DIR / f"master_{upload_date:%Y%m%d}_{file_hash[:16]}.parquet"
+
+    # NPSN bisa campuran angka dan teks ("P..."), Arrow butuh satu tipe
+    df = df.assign(NPSN=df["NPSN"].map(str, na_action="ignore"))
+
+    # Tulis ke file sementara dulu: snapshot gagal tidak muncul di daftar
+    tmp_path = path.with_suffix(".tmp")
+    try:
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+    return path
+
+
+def list_snapshots():
+    return sorted(SNAPSHOT_DIR.glob("master_*.parquet"), reverse=True)
+
+
+@st.cache_data(max_entries=8, show_spinner="Membaca snapshot...")
+def load_snapshot(path, columns=None):
+    return pd.read_parquet(path, columns=columns)
+
+
+@st.cache_data(max_entries=8, show_spinner="Mengolah data...")
+def prepare_master(fingerprint, _dapodik):
+    """
+    fingerprint : hash data sumber (kunci cache)
+    _dapodik    : data Master (tidak ikut di-hash)
+
+    Hasil : (data tanpa SMA/SMK/SLB + kolom turunan, index filter)
+    """
+    dapodik_filtered = _dapodik.loc[~_dapodik["BP"].isin(["SMA", "SMK", "SLB"])].copy()
+
+    # Indikator SYNC (bool), dijumlahkan langsung saat agregasi
+    dapodik_filtered["Belum_SYNC"] = dapodik_filtered["Last Sync"].eq("belum kirim")
+    dapodik_filtered["Sudah_SYNC"] = ~dapodik_filtered["Belum_SYNC"]
 
     dapodik_filtered["Jml_GTK"] = (
         dapodik_filtered["Guru"] + dapodik_filtered["Tendik"]
     )
-    dapodik_filtered_SMP["Jml_GTK"] = (
-        dapodik_filtered_SMP["Guru"] + dapodik_filtered_SMP["Tendik"]
+
+    # NPSN sebagai kode integer, dipakai untuk hitung SP unik per group
+    dapodik_filtered["NPSN_Kode"] = pd.factorize(dapodik_filtered["NPSN"])[0]
+
+    return dapodik_filtered, filter_index(dapodik_filtered)
+
+
+@st.cache_data(max_entries=32, show_spinner="Mengolah data...")
+def aggregate_master(fingerprint, _rows):
+    """
+    fingerprint : hash data sumber + filter (kunci cache)
+    _rows       : data hasil prepare_master / filter (tidak ikut di-hash)
+    """
+    # Jenjang SMP diambil sebagai slice BP == "SMP" dari cube yang sama
+    return aggregate_tables(_rows, REPORT_SPECS)
+
+
+# =========================
+# STREAMLIT UI
+# =========================
+st.title("Rekap Progres SYNC DAPODIK")
+
+uploaded_file = st.file_uploader("Upload File Excel", type=["xlsx"])
+
+snapshots = list_snapshots()
+snapshot_file = None
+
+if snapshots and not uploaded_file:
+    snapshot_file = st.sidebar.selectbox(
+        "📦 Gunakan Snapshot Master",
+        [None] + snapshots,
+        format_func=lambda path: "-" if path is None else path.stem
     )
 
+dapodik = None
+
+if uploaded_file:
+
     # =========================
-    # KOLOM NEGERI / SWASTA
-    # =========================
-    for col in ["NPSN", "PD", "Rombel", "Guru", "Tendik", "Jml_GTK"]:
-        if col == "NPSN":
-            dapodik_filtered[f"{col}_Negeri"] = np.where(
-                dapodik_filtered["Status"] == "NEGERI",
-                dapodik_filtered[col],
-                None
-            )
-            dapodik_filtered[f"{col}_Swasta"] = np.where(
-                dapodik_filtered["Status"] == "SWASTA",
-                dapodik_filtered[col],
-                None
-            )
-        else:
-            dapodik_filtered[f"{col}_Negeri"] = np.where(
-                dapodik_filtered["Status"] == "NEGERI",
-                dapodik_filtered[col],
-                0
-            )
-            dapodik_filtered[f"{col}_Swasta"] = np.where(
-                dapodik_filtered["Status"] == "SWASTA",
-                dapodik_filtered[col],
-                0
-            )
-    
-    # =========================
-    # KOLOM NEGERI / SWASTA JENJANG SMP
+    # BACA FILE
     # =========================
-    for col_SMP in ["NPSN", "PD", "Rombel", "Guru", "Tendik", "Jml_GTK"]:
-        if col_SMP == "NPSN":
-            dapodik_filtered_SMP[f"{col_SMP}_Negeri"] = np.where(
-                dapodik_filtered_SMP["Status"] == "NEGERI",
-                dapodik_filtered_SMP[col_SMP],
-                None
-            )
-            dapodik_filtered_SMP[f"{col_SMP}_Swasta"] = np.where(
-                dapodik_filtered_SMP["Status"] == "SWASTA",
-                dapodik_filtered_SMP[col_SMP],
-                None
-            )
-        else:
-            dapodik_filtered_SMP[f"{col_SMP}_Negeri"] = np.where(
-                dapodik_filtered_SMP["Status"] == "NEGERI",
-                dapodik_filtered_SMP[col_SMP],
-                0
-            )
-            dapodik_filtered_SMP[f"{col_SMP}_Swasta"] = np.where(
-                dapodik_filtered_SMP["Status"] == "SWASTA",
-                dapodik_filtered_SMP[col_SMP],
-                0
-            )
+    # Rerun dengan file yang sama tidak mem-parse ulang workbook
+    file_bytes = uploaded_file.getvalue()
+    file_hash = hashlib.sha256(file_bytes).hexdigest()
 
+    dapodik = load_master(file_hash, "Master", file_bytes)
 
     # =========================
-    # AGREGASI
+    # SIMPAN SNAPSHOT
     # =========================
-    per_kec = (
-        dapodik_filtered
-        .groupby("Kecamatan")
-        .agg(
-            SP=("NPSN", "nunique"),
-            Sudah_SYNC=("Status_SYNC", lambda x: (x == "Sudah").sum()),
-            Belum_SYNC=("Status_SYNC", lambda x: (x == "Belum").sum()),
-            PD=("PD", "sum"),
-            Rombel=("Rombel", "sum"),
-            Guru=("Guru", "sum"),
-            Tendik=("Tendik", "sum"),
-            Jml_GTK=("Jml_GTK", "sum")
-        )
-        .reset_index()
-        .sort_values("Kecamatan")
-    )
+    # Tanggal dan tombol simpan hanya me-rerun panel ini
+    @st.fragment
+    def snapshot_panel():
+        with st.expander("💾 Simpan Snapshot Master"):
+            upload_date = st.date_input("Tanggal upload", value=date.today())
 
-    per_kec_NS = (
-        dapodik_filtered
-        .groupby("Kecamatan")
-        .agg(
-            SP_Negeri=("NPSN_Negeri", "nunique"),
-            SP_Swasta=("NPSN_Swasta", "nunique"),
-            Jml_SP=("NPSN", "nunique"),
-            
-            PD_Negeri=("PD_Negeri", "sum"),
-            PD_Swasta=("PD_Swasta", "sum"),
-            Jml_PD=("PD", "sum"),
-            
-            Rombel_Negeri=("Rombel_Negeri", "sum"),
-            Rombel_Swasta=("Rombel_Swasta", "sum"),
-            Jml_Rombel=("Rombel", "sum"),
-            
-            Guru_Negeri=("Guru_Negeri", "sum"),
-            Guru_Swasta=("Guru_Swasta", "sum"),
-            Jml_Guru=("Guru", "sum"),
-            
-            Tendik_Negeri=("Tendik_Negeri", "sum"),
-            Tendik_Swasta=("Tendik_Swasta", "sum"),
-            Jml_Tendik=("Tendik", "sum"),
-            
-            Jml_GTK_Negeri=("Jml_GTK_Negeri", "sum"),
-            Jml_GTK_Swasta=("Jml_GTK_Swasta", "sum"),
-            Jml_GTK=("Jml_GTK", "sum")
-        )
-        .reset_index()
-        .sort_values("Kecamatan")
-    )
+            if st.button("Simpan Snapshot", use_container_width=True):
+                try:
+                    path = save_snapshot(dapodik, upload_date, file_hash)
+                    st.success(f"Snapshot disimpan: {path.name}")
+                except ImportError as e:
+                    st.warning(f"Gagal menyimpan snapshot (butuh pyarrow): {e}")
+                except (ValueError, ArrowException, OSError) as e:
+                    st.warning(f"Gagal menyimpan snapshot: {e}")
+
+    with st.sidebar:
+        snapshot_panel()
+
+elif snapshot_file is not None:
 
-    per_bp_NS = (
-        dapodik_filtered
-        .groupby("BP")
-        .agg(
-            SP_Negeri=("NPSN_Negeri", "nunique"),
-            SP_Swasta=("NPSN_Swasta", "nunique"),
-            Jml_SP=("NPSN", "nunique"),
-            
-            PD_Negeri=("PD_Negeri", "sum"),
-            PD_Swasta=("PD_Swasta", "sum"),
-            Jml_PD=("PD", "sum"),
-            
-            Rombel_Negeri=("Rombel_Negeri", "sum"),
-            Rombel_Swasta=("Rombel_Swasta", "sum"),
-            Jml_Rombel=("Rombel", "sum"),
-            
-            Guru_Negeri=("Guru_Negeri", "sum"),
-            Guru_Swasta=("Guru_Swasta", "sum"),
-            Jml_Guru=("Guru", "sum"),
-            
-            Tendik_Negeri=("Tendik_Negeri", "sum"),
-            Tendik_Swasta=("Tendik_Swasta", "sum"),
-            Jml_Tendik=("Tendik", "sum"),
-            
-            Jml_GTK_Negeri=("Jml_GTK_Negeri", "sum"),
-            Jml_GTK_Swasta=("Jml_GTK_Swasta", "sum"),
-            Jml_GTK=("Jml_GTK", "sum")
-        )
-        .reset_index()
-        .sort_values("BP")
-    )
-    
     # =========================
-    # AGREGASI JENJANG SMP
+    # BACA SNAPSHOT
     # =========================
-    
-    per_kec_SMP = (
-        dapodik_filtered_SMP
-        .groupby("Kecamatan")
-        .agg(
-            SP=("NPSN", "nunique"),
-            Sudah_SYNC=("Status_SYNC", lambda x: (x == "Sudah").sum()),
-            Belum_SYNC=("Status_SYNC", lambda x: (x == "Belum").sum()),
-            PD=("PD", "sum"),
-            Rombel=("Rombel", "sum"),
-            Guru=("Guru", "sum"),
-            Tendik=("Tendik", "sum"),
-            Jml_GTK=("Jml_GTK", "sum")
-        )
-        .reset_index()
-        .sort_values("Kecamatan")
-    )
-    
-    per_kec_SP_SMP = (
-        dapodik_filtered_SMP
-        .groupby("Kecamatan")
-        .agg(
-            Jml_SP=("NPSN", "nunique"),
-            SP_Negeri=("NPSN_Negeri", "nunique"),
-            SP_Swasta=("NPSN_Swasta", "nunique"),            
-            
-            Sudah_SYNC=("Status_SYNC", lambda x: (x == "Sudah").sum()),
-            Belum_SYNC=("Status_SYNC", lambda x: (x == "Belum").sum())
-        )
-        .reset_index()
-        .sort_values("Kecamatan")
-    )
-    
-    per_kec_PDRombel_SMP = (
-        dapodik_filtered_SMP
-        .groupby("Kecamatan")
-        .agg(
-            PD_Negeri=("PD_Negeri", "sum"),
-            PD_Swasta=("PD_Swasta", "sum"),
-            Jml_PD=("PD", "sum"),
-            
-            Rombel_Negeri=("Rombel_Negeri", "sum"),
-            Rombel_Swasta=("Rombel_Swasta", "sum"),
-            Jml_Rombel=("Rombel", "sum")
-        )
-        .reset_index()
-        .sort_values("Kecamatan")
-    )
-    
-    per_kec_GTK_SMP = (
-        dapodik_filtered_SMP
-        .groupby("Kecamatan")
-        .agg(
-            Jml_GTK=("Jml_GTK", "sum"),
-            
-            Guru_Negeri=("Guru_Negeri", "sum"),
-            Guru_Swasta=("Guru_Swasta", "sum"),
-            Jml_Guru=("Guru", "sum"),
-            
-            Tendik_Negeri=("Tendik_Negeri", "sum"),
-            Tendik_Swasta=("Tendik_Swasta", "sum"),
-            Jml_Tendik=("Tendik", "sum")            
-        )
-        .reset_index()
-        .sort_values("Kecamatan")
-    )
-    
-    per_kec_ALL_SMP = (
-        dapodik_filtered_SMP
-        .groupby("Kecamatan")
-        .agg(            
-            SP_Negeri=("NPSN_Negeri", "nunique"),
-            SP_Swasta=("NPSN_Swasta", "nunique"),
-            
-            PD_Negeri=("PD_Negeri", "sum"),
-            PD_Swasta=("PD_Swasta", "sum"),            
-            
-            Rombel_Negeri=("Rombel_Negeri", "sum"),
-            Rombel_Swasta=("Rombel_Swasta", "sum"),                      
-            
-            Guru_Negeri=("Guru_Negeri", "sum"),
-            Guru_Swasta=("Guru_Swasta", "sum"),            
-            
-            Tendik_Negeri=("Tendik_Negeri", "sum"),
-            Tendik_Swasta=("Tendik_Swasta", "sum"),
-            
-            Jml_SP=("NPSN", "nunique"),
-            Jml_PD=("PD", "sum"),
-            Jml_Rombel=("Rombel", "sum"),
-            Jml_Guru=("Guru", "sum"),
-            Jml_Tendik=("Tendik", "sum"),
-            Jml_GTK=("Jml_GTK", "sum")            
-        )
-        .reset_index()
-        .sort_values("Kecamatan")
-    )
+    file_hash = snapshot_file.stem.rsplit("_", 1)[-1]
+    dapodik = load_snapshot(str(snapshot_file), list(MASTER_SCHEMA))
+
+if dapodik is not None:
 
     # =========================
-    # TOTAL ROW
+    # AGREGASI
     # =========================
-    def add_total_row(df, label_column):
-        df = df.copy()
+    master_rows, index = prepare_master(file_hash, dapodik)
 
-        # 🔹 Hapus kolom auto id jika ada
-        df = df.loc[:, ~df.columns.str.contains("::auto_unique_id::", case=False)]
+    # Filter = irisan index posisi baris, lalu agregasi ulang baris terpilih
+    selection = filter_panel(index)
+    fingerprint = filter_fingerprint(file_hash, selection)
+    positions = select_positions(index, selection)
 
-        # 🔹 Ambil hanya kolom numerik untuk dijumlahkan
-        numeric_cols = df.select_dtypes(include="number").columns
+    if positions is None:
+        dapodik_filtered = master_rows
+    else:
+        dapodik_filtered = master_rows.take(positions)
 
-        # 🔹 Hitung total
-        total_values = df[numeric_cols].sum()
+    if dapodik_filtered.empty:
+        st.warning("Tidak ada data yang sesuai dengan filter.")
+        st.stop()
 
-        # 🔹 Buat row total
-        total_row = {col: "" for col in df.columns}
-        total_row[label_column] = "TOTAL"
+    # Hasil di-cache per fingerprint: interaksi di fragment
+    # (tab, download, bundle) tidak mengulang agregasi
+    tables = aggregate_master(fingerprint, dapodik_filtered)
 
-        for col in numeric_cols:
-            total_row[col] = total_values[col]
+    per_kec = tables["per_kec"]
 
-        # 🔹 Append ke dataframe
-        df = pd.concat([df, pd.DataFrame([total_row])], ignore_index=True)
+    @st.cache_data(max_entries=8, show_spinner=False)
+    def reports_for(fingerprint, _tables):
+        return materialize_reports(_tables)
 
-        return df
-
-    per_kec_final = add_total_row(per_kec, "Kecamatan")
-    per_kec_NS_final = add_total_row(per_kec_NS, "Kecamatan")
-    per_bp_NS_final = add_total_row(per_bp_NS, "BP")
-    
-    per_kec_SMP_final = add_total_row(per_kec_SMP, "Kecamatan")
-    per_kec_SP_SMP_final = add_total_row(per_kec_SP_SMP, "Kecamatan")
-    per_kec_PDRombel_SMP_final = add_total_row(per_kec_PDRombel_SMP, "Kecamatan")
-    per_kec_GTK_SMP_final = add_total_row(per_kec_GTK_SMP, "Kecamatan")
-    per_kec_ALL_SMP_final = add_total_row(per_kec_ALL_SMP, "Kecamatan")
+    reports = reports_for(fingerprint, tables)
 
 
     st.success("Data berhasil diproses!")
@@ -428,16 +341,35 @@ if uploaded_file:
     # =========================
     # KPI DASHBOARD
     # =========================
+    @st.cache_data(max_entries=8, show_spinner=False)
+    def dashboard_data(fingerprint, _rows, _per_kec):
+        """
+        Hasil : (total SP, sudah SYNC, data grafik, ranking Kecamatan)
+        Dihitung sekali per fingerprint, bukan tiap rerun.
+        """
+        # total_sp = per_kec["SP"].sum()
+        # total_sudah = per_kec["Sudah_SYNC"].sum()
+        total_sp = _rows["NPSN"].nunique()
+        total_sudah = _rows.loc[_rows["Sudah_SYNC"], "NPSN"].nunique()
 
-    # total_sp = per_kec["SP"].sum()
-    # total_sudah = per_kec["Sudah_SYNC"].sum()
-    # total_belum = per_kec["Belum_SYNC"].sum()
-    # persen_sync = (total_sudah / total_sp * 100) if total_sp else 0
-    
-    total_sp = dapodik_filtered["NPSN"].nunique()
-    total_sudah = dapodik_filtered.loc[
-        dapodik_filtered["Status_SYNC"] == "Sudah", "NPSN"
-    ].nunique()
+        chart_data = _per_kec[["Kecamatan", "Sudah_SYNC", "Belum_SYNC"]]
+        chart_data = chart_data.set_index("Kecamatan")
+
+        ranking = _per_kec.copy()
+        ranking["Persentase_SYNC"] = (
+            ranking["Sudah_SYNC"] / ranking["SP"] * 100
+        ).round(2)
+
+        ranking = ranking.sort_values(
+            "Persentase_SYNC", ascending=False
+        )
+
+        return total_sp, total_sudah, chart_data, ranking
+
+    # Bagian ini tanpa widget, jadi bukan fragment: cukup membaca cache
+    total_sp, total_sudah, chart_data, ranking = dashboard_data(
+        fingerprint, dapodik_filtered, per_kec
+    )
 
     total_belum = total_sp - total_sudah
 
@@ -449,479 +381,165 @@ if uploaded_file:
     col2.metric("Sudah SYNC", f"{total_sudah:,}")
     col3.metric("Belum SYNC", f"{total_belum:,}")
     col4.metric("Persentase SYNC", f"{persen_sync:.2f}%")
-    
+
     # =========================
     # GRAFIK PROGRES SYNC
     # =========================
-
     st.subheader("📊 Grafik Progres SYNC per Kecamatan")
 
-    chart_data = per_kec[["Kecamatan", "Sudah_SYNC", "Belum_SYNC"]]
-    chart_data = chart_data.set_index("Kecamatan")
-
     st.bar_chart(chart_data)
-    
+
     # =========================
     # RANKING KECAMATAN
     # =========================
-
-    ranking = per_kec.copy()
-    ranking["Persentase_SYNC"] = (
-        ranking["Sudah_SYNC"] / ranking["SP"] * 100
-    ).round(2)
-
-    ranking = ranking.sort_values(
-        "Persentase_SYNC", ascending=False
-    )
-
     st.subheader("🏆 Ranking Kecamatan Berdasarkan Persentase SYNC")
 
     st.dataframe(
         ranking[["Kecamatan", "SP", "Sudah_SYNC", "Belum_SYNC", "Persentase_SYNC"]],
         use_container_width=True
     )
-    
-    # =========================
-    # TABS UNTUK TABEL
-    # =========================
-
-    tab1, tab2, tab3 = st.tabs([
-        "📊 Rekap Per Kecamatan",
-        "🏫 Rekap Negeri/Swasta Per Kecamatan",
-        "📌 Rekap Negeri/Swasta Per BP"
-    ])
-
-    with tab1:
-        show_aggrid(per_kec_final, "grid_kec")
-
-    with tab2:
-        show_aggrid(per_kec_NS_final, "grid_kec_ns")
-
-    with tab3:
-        show_aggrid(per_bp_NS_final, "grid_bp_ns")
 
 
     # =========================
-    # TABS UNTUK TABEL JENJANG SMP
+    # TABS UNTUK TABEL
     # =========================
+    # Pindah tab, sort/filter/halaman grid hanya me-rerun bagian ini
+    @st.fragment
+    def grid_section():
+        # Satu set tab per sheet: Rekap Master, lalu Eksplorasi Jenjang SMP
+        for sheet_name in REPORT_SHEETS:
+            sheet_specs = [
+                (name, spec) for name, spec in REPORT_SPECS.items()
+                if spec["sheet"] == sheet_name
+            ]
 
-    tab_smp_1, tab_smp_2, tab_smp_3, tab_smp_4, tab_smp_5 = st.tabs([
-        "📊 DAPODIK SMP",
-        "🏫 SP dan SYNC SMP",
-        "📌 PD dan Rombel SMP",
-        "📌 Progres GTK SMP",
-        "📌 ALL DAPODIK SMP"
-    ])
-
-    with tab_smp_1:
-        show_aggrid(per_kec_SMP_final, "grid_kec_smp")
-
-    with tab_smp_2:
-        show_aggrid(per_kec_SP_SMP_final, "grid_kec_sp_smp")
-
-    with tab_smp_3:
-        show_aggrid(per_kec_PDRombel_SMP_final, "grid_kec_pdrombel_smp")
-        
-    with tab_smp_4:
-        show_aggrid(per_kec_GTK_SMP_final, "grid_kec_gtk_smp")
-    
-    with tab_smp_5:
-        show_aggrid(per_kec_ALL_SMP_final, "grid_kec_all_smp")
-        
-            
-
-
-    # =========================================
-    # GLOBAL STYLE CONFIG
-    # =========================================
-    HEADER_FILL = PatternFill("solid", fgColor="1F4E78")
-    HEADER_FONT = Font(color="FFFFFF", bold=True)
-    TITLE_FONT = Font(size=14, bold=True)
-    TOTAL_FILL = PatternFill("solid", fgColor="FFF2CC")
-    THIN_BORDER = Border(
-        left=Side(style="thin"),
-        right=Side(style="thin"),
-        top=Side(style="thin"),
-        bottom=Side(style="thin"),
-    )
-    NUMBER_FORMAT_INTEGER = '#,##0'
-    NUMBER_FORMAT_DECIMAL = '#,##0.00'
-    NUMBER_FORMAT_PERCENT = '0.00%'
-
-
-    # =========================================
-    # STYLE TABLE FUNCTION
-    # =========================================
-    def style_table(ws, start_row, df, title=None):
-        """
-        start_row : baris pertama tabel (1-based Excel)
-        df        : dataframe
-        """
-
-        n_cols = len(df.columns)
-        header_row = start_row
-        data_start = header_row + 1
-        data_end = data_start + len(df) - 1
-        total_row = data_end
-
-        # =========================
-        # TITLE
-        # =========================
-        if title:
-            ws.insert_rows(start_row)
-            ws.cell(row=start_row, column=1, value=title)
-            ws.cell(row=start_row, column=1).font = TITLE_FONT
-            ws.merge_cells(
-                start_row=start_row,
-                start_column=1,
-                end_row=start_row,
-                end_column=n_cols
-            )
-            header_row += 1
-            data_start += 1
-            data_end += 1
-            total_row += 1
-
-        # =========================
-        # HEADER STYLE
-        # =========================
-        for col in range(1, n_cols + 1):
-            cell = ws.cell(row=header_row, column=col)
-            cell.fill = HEADER_FILL
-            cell.font = HEADER_FONT
-            cell.alignment = Alignment(horizontal="center", vertical="center")
-            cell.border = THIN_BORDER
-
-        # =========================
-        # DATA + TOTAL STYLE
-        # =========================
-        for row in ws.iter_rows(
-            min_row=data_start,
-            max_row=data_end,
-            min_col=1,
-            max_col=n_cols
-            
-        ):
-            for i, cell in enumerate(row):
-                col_name = df.columns[i]
-                
-                cell.border = THIN_BORDER                
-                
-                if i == 0:
-                    cell.alignment = Alignment(horizontal="left")
-                else:
-                    cell.alignment = Alignment(horizontal="right")
-                
-                # =========================
-                # FORMAT NUMERIC OTOMATIS
-                # =========================
-                if pd.api.types.is_integer_dtype(df[col_name]):
-                    cell.number_format = NUMBER_FORMAT_INTEGER
-
-                elif pd.api.types.is_float_dtype(df[col_name]):
-
-                    # Jika kolom persentase
-                    if "%" in col_name.lower() or "persen" in col_name.lower():
-                        cell.number_format = NUMBER_FORMAT_PERCENT
-                    else:
-                        cell.number_format = NUMBER_FORMAT_DECIMAL
-
-        # Highlight TOTAL row
-        for col in range(1, n_cols + 1):
-            cell = ws.cell(row=total_row, column=col)
-            cell.fill = TOTAL_FILL
-            cell.font = Font(bold=True)
-
-
-        # =========================
-        # AUTO WIDTH (Only Table Range)
-        # =========================
-        for col in range(1, n_cols + 1):
-            column_letter = get_column_letter(col)
-            max_len = 0
-
-            for row in range(header_row, data_end + 1):
-                value = ws.cell(row=row, column=col).value
-                if value:
-                    max_len = max(max_len, len(str(value)))
-
-            ws.column_dimensions[column_letter].width = max_len + 3
-
-
-    # =========================================
-    # WRITE MULTIPLE TABLES
-    # =========================================
-    def write_tables(writer, sheet_name, tables, spacing=4):
-
-        ws = writer.book.create_sheet(sheet_name)
-        writer.sheets[sheet_name] = ws
-
-        current_row = 1
-
-        for df, title in tables:
-
-            df.to_excel(
-                writer,
-                sheet_name=sheet_name,
-                index=False,
-                startrow=current_row - 1
+            # Hanya grid di tab yang sedang dibuka yang dibangun dan dikirim
+            sheet_tabs = st.tabs(
+                [spec["tab"] for _, spec in sheet_specs],
+                key=f"tabs_{sheet_name}",
+                on_change="rerun"
             )
 
-            style_table(
-                ws=ws,
-                start_row=current_row,
-                df=df,
-                title=title
-            )
+            for tab, (name, spec) in zip(sheet_tabs, sheet_specs):
+                with tab:
+                    if tab.open:
+                        show_aggrid(reports[name], spec["grid_key"])
 
-            # Update posisi berikutnya
-            current_row += len(df) + spacing + 2
+    grid_section()
 
 
     # =========================================
     # EXPORT EXECUTION
     # =========================================
-    excel_buffer = io.BytesIO()
-    
-    export_kec = per_kec_final[
-        ["Kecamatan","SP","Sudah_SYNC","Belum_SYNC","PD","Rombel","Guru","Tendik","Jml_GTK"]
-    ]
-    
-    export_kec_NS = per_kec_NS_final[
-        ["Kecamatan", "SP_Negeri", "SP_Swasta", "Jml_SP", "PD_Negeri", "PD_Swasta", "Jml_PD", "Rombel_Negeri", "Rombel_Swasta", "Jml_Rombel", 
-        "Guru_Negeri", "Guru_Swasta", "Jml_Guru", "Tendik_Negeri", "Tendik_Swasta", "Jml_Tendik", "Jml_GTK_Negeri", "Jml_GTK_Swasta", "Jml_GTK"]
-    ]
-    
-    export_bp_NS = per_bp_NS_final[
-        ["BP", "SP_Negeri", "SP_Swasta", "Jml_SP", "PD_Negeri", "PD_Swasta", "Jml_PD", "Rombel_Negeri", "Rombel_Swasta", "Jml_Rombel", 
-        "Guru_Negeri", "Guru_Swasta", "Jml_Guru", "Tendik_Negeri", "Tendik_Swasta", "Jml_Tendik", "Jml_GTK_Negeri", "Jml_GTK_Swasta", "Jml_GTK"]
-    ]
-    
-    # =============
-    # EKSPLORASI
-    # =============
-    
-    export_kec_SMP = per_kec_SMP_final[
-        ["Kecamatan","SP","Sudah_SYNC","Belum_SYNC","PD","Rombel","Guru","Tendik","Jml_GTK"]
-    ]
-        
-    export_kec_SP_SMP = per_kec_SP_SMP_final[
-        ["Kecamatan", "Jml_SP", "SP_Negeri", "SP_Swasta", "Sudah_SYNC","Belum_SYNC"]
-    ]
-        
-    export_kec_PDRombel_SMP = per_kec_PDRombel_SMP_final[
-        ["Kecamatan", "PD_Negeri", "PD_Swasta", "Jml_PD", "Rombel_Negeri", "Rombel_Swasta", "Jml_Rombel"]
-    ]
-        
-    export_kec_GTK_SMP = per_kec_GTK_SMP_final[
-        ["Kecamatan", "Jml_GTK", "Guru_Negeri", "Guru_Swasta", "Jml_Guru", "Tendik_Negeri", "Tendik_Swasta", "Jml_Tendik"]
-    ]
-        
-    export_kec_ALL_SMP = per_kec_ALL_SMP_final[
-        ["Kecamatan", "SP_Negeri", "SP_Swasta", "PD_Negeri", "PD_Swasta", "Rombel_Negeri", "Rombel_Swasta", "Guru_Negeri", "Guru_Swasta", "Jml_Guru", 
-        "Tendik_Negeri", "Tendik_Swasta", "Jml_SP", "Jml_PD", "Jml_Rombel", "Jml_Tendik", "Jml_GTK"]
-    ]
-    
-    with pd.ExcelWriter(excel_buffer, engine="openpyxl") as writer:
-
-        write_tables(
-            writer,
-            "Rekap_Master",
-            [
-                (export_kec, "Rekapitulasi Progres SYNC DAPODIK per Kecamatan"),
-                (export_kec_NS, "Rekapitulasi SYNC Negeri/Swasta per Kecamatan"),
-                (export_bp_NS, "Rekapitulasi SYNC Negeri/Swasta per Jenjang"),
-            ]
-        )
-
-        write_tables(
-            writer,
-            "Eksplorasi_SMP",
-            [
-                (export_kec_SMP, "Eksplorasi Progres SMP per Kecamatan"),
-                (export_kec_SP_SMP, "Eksplorasi SP & SYNC SMP"),
-                (export_kec_PDRombel_SMP, "Eksplorasi PD & Rombel SMP"),
-                (export_kec_GTK_SMP, "Eksplorasi GTK SMP"),
-                (export_kec_ALL_SMP, "Eksplorasi ALL SMP"),
-            ]
-        )
-
-    excel_buffer.seek(0)
+    excel_sheets, tables_config = report_tables(reports)
 
+    # Excel dan PDF dirender di process pool saat laporan diminta
+    download_section(fingerprint, REPORT_LAYOUT, excel_sheets, tables_config)
 
 
     # =========================
-    # EXPORT PDF (IN MEMORY)
+    # BUNDLE PER KECAMATAN
     # =========================
-    pdf_buffer = io.BytesIO()
-
-    doc = SimpleDocTemplate(
-        pdf_buffer,
-        pagesize=landscape(A4),
-        leftMargin=1 * inch,
-        rightMargin=0.8 * inch,
-        topMargin=0.8 * inch,
-        bottomMargin=0.8 * inch
-    )
+    def bundle_folder_name(kecamatan, used):
+        """
+        Nama folder ZIP yang aman untuk satu Kecamatan.
+        Nama kosong diganti "Kecamatan", nama yang bentrok
+        (tanpa beda huruf besar/kecil) diberi akhiran _2, _3, ...
+        """
+        base = re.sub(r"[^\w\-]+", "_", str(kecamatan)).strip("_") or "Kecamatan"
 
-    elements = []
-    styles = getSampleStyleSheet()
+        name, n = base, 1
+        while name.lower() in used:
+            n += 1
+            name = f"{base}_{n}"
 
+        used.add(name.lower())
+        return name
 
-    # =========================
-    # STYLE
-    # =========================
-    cell_left = ParagraphStyle(
-        name='cell_left',
-        parent=styles['Normal'],
-        fontSize=8,
-        alignment=TA_LEFT
-    )
 
-    cell_right = ParagraphStyle(
-        name='cell_right',
-        parent=styles['Normal'],
-        fontSize=8,
-        alignment=TA_RIGHT
-    )
+    def build_kecamatan_bundle(groups, progress):
+        """
+        Laporan tiap Kecamatan dirender paralel di process pool
+        (render openpyxl/reportlab terikat CPU, thread tertahan GIL)
+        dan langsung ditulis ke ZIP di file sementara, jadi hanya
+        laporan yang sedang diproses yang ada di memori.
 
-    header_style = ParagraphStyle(
-        name='header_style',
-        parent=styles['Normal'],
-        fontName='Helvetica-Bold',
-        fontSize=8,
-        textColor=colors.white,
-        alignment=TA_CENTER
-    )
+        Hasil : (file ZIP, {Kecamatan: exception} untuk yang gagal)
+        """
+        total = len(groups)
+        max_workers = min(total, os.cpu_count() or 1)
 
-    def build_pdf_table(elements, df, title, doc, styles,
-                    header_style, cell_left, cell_right,
-                    format_number,
-                    landscape_mode=True,
-                    add_page_break=True):
-
-        # Optional title
-        if title:
-            elements.append(Paragraph(title, styles["Title"]))
-            elements.append(Spacer(1, 12))
-
-        # =====================
-        # Build Data
-        # =====================
-        data = []
-
-        # Header
-        data.append([
-            Paragraph(str(col), header_style)
-            for col in df.columns
-        ])
-
-        # Rows
-        for _, row in df.iterrows():
-            row_data = [
-                Paragraph(str(value), cell_left) if i == 0
-                else Paragraph(format_number(value), cell_right)
-                for i, value in enumerate(row)
-            ]
-            data.append(row_data)
+        # Nama folder ditentukan sebelum render, urut Kecamatan,
+        # supaya tidak bergantung pada urutan selesainya worker
+        used = set()
+        folders = [bundle_folder_name(kecamatan, used) for kecamatan, _ in groups]
 
-        # =====================
-        # Column Width
-        # =====================
-        if landscape_mode:
-            page_width, _ = landscape(A4)
-        else:
-            page_width, _ = A4
+        failed = {}
 
-        usable_width = page_width - doc.leftMargin - doc.rightMargin
-        num_cols = len(df.columns)
+        # Tanpa buffer: FileIO bisa langsung diberikan ke st.download_button
+        bundle = tempfile.TemporaryFile(buffering=0)
 
-        ratio = [2.5] + [1] * (num_cols - 1)
-        total_ratio = sum(ratio)
+        with ProcessPoolExecutor(max_workers=max_workers) as executor, \
+                zipfile.ZipFile(bundle, "w", zipfile.ZIP_DEFLATED) as zf:
 
-        col_widths = [(r / total_ratio) * usable_width for r in ratio]
+            futures = {
+                executor.submit(render_kecamatan_report, kec_rows): (kecamatan, name)
+                for (kecamatan, kec_rows), name in zip(groups, folders)
+            }
 
-        # =====================
-        # Create Table
-        # =====================
-        table = Table(data, colWidths=col_widths, repeatRows=1)
+            for done, future in enumerate(as_completed(futures), start=1):
+                kecamatan, name = futures.pop(future)
 
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ]))
+                try:
+                    excel_bytes, pdf_bytes = future.result()
+                except Exception as e:
+                    # Satu Kecamatan gagal tidak membatalkan bundle
+                    failed[kecamatan] = e
+                else:
+                    zf.writestr(f"{name}/Rekap_Progres_{name}.xlsx", excel_bytes)
+                    zf.writestr(f"{name}/Rekap_Progres_{name}.pdf", pdf_bytes)
 
-        elements.append(table)
-        elements.append(Spacer(1, 24))
+                progress.progress(
+                    done / total,
+                    text=f"Laporan {kecamatan} selesai ({done}/{total})"
+                )
 
-        if add_page_break:
-            elements.append(PageBreak())
+        return bundle, failed
 
-    # =========================
-    # BUILD ALL TABLES
-    # =========================
 
-    tables_config = [
-        (export_kec, "Rekapitulasi Progres SYNC DAPODIK per Kecamatan"),
-        (export_kec_NS, "Rekapitulasi Progres SYNC DAPODIK Negeri/Swasta per Kecamatan"),
-        (export_bp_NS, "Rekapitulasi Progres SYNC DAPODIK Negeri/Swasta per Jenjang"),
-        (export_kec_SMP, "Eksplorasi Progres DAPODIK SMP per Kecamatan"),
-        (export_kec_SP_SMP, "Eksplorasi Progres SP dan SYNC SMP per Kecamatan"),
-        (export_kec_PDRombel_SMP, "Eksplorasi Progres PD dan Rombel SMP per Kecamatan"),
-        (export_kec_GTK_SMP, "Eksplorasi Progres GTK SMP per Kecamatan"),
-        (export_kec_ALL_SMP, "Eksplorasi Progres ALL DAPODIK SMP per Kecamatan"),
-    ]
-
-    for i, (df, title) in enumerate(tables_config):
-
-        build_pdf_table(
-            elements=elements,
-            df=df,
-            title=title,
-            doc=doc,
-            styles=styles,
-            header_style=header_style,
-            cell_left=cell_left,
-            cell_right=cell_right,
-            format_number=format_number,
-            add_page_break=(i < len(tables_config) - 1)  # No page break at last table
-        )
+    @st.fragment
+    def bundle_section():
+        with st.expander("📦 Laporan per Kecamatan (ZIP)"):
 
-    # =========================
-    # BUILD PDF
-    # =========================
-    doc.build(elements)
+            if st.button("📦 Buat Bundle per Kecamatan", use_container_width=True):
 
-    # Reset buffer posisi ke awal
-    pdf_buffer.seek(0)
-    excel_buffer.seek(0)
+                groups = list(dapodik_filtered.groupby("Kecamatan", observed=True))
 
-    # =========================
-    # DOWNLOAD SECTION
-    # =========================
-    st.markdown("### 📥 Download Laporan")
+                if not groups:
+                    st.info("Tidak ada data Kecamatan untuk dibuat laporan.")
+                    return
 
-    with st.container():
+                progress = st.progress(0, text="Menyiapkan laporan per Kecamatan...")
 
-        col1, col2 = st.columns(2)
+                bundle, failed = build_kecamatan_bundle(groups, progress)
 
-        with col1:
-            st.download_button(
-                label="📊 Download Excel",
-                data=excel_buffer,
-                file_name="Rekap_Progres_SYNC_DAPODIK.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                use_container_width=True
-            )
+                with bundle:
+                    progress.empty()
 
-        with col2:
-            st.download_button(
-                label="📄 Download PDF",
-                data=pdf_buffer,
-                file_name="Rekap_Progres_SYNC_DAPODIK.pdf",
-                mime="application/pdf",
-                use_container_width=True
-            )
+                    for kecamatan, error in failed.items():
+                        st.error(f"Gagal membuat laporan Kecamatan {kecamatan}: {error}")
+
+                    if len(failed) == len(groups):
+                        return
+
+                    # File ZIP diberikan langsung, tanpa disalin ke bytes dulu
+                    st.download_button(
+                        label="⬇️ Download Bundle ZIP",
+                        data=bundle,
+                        file_name="Rekap_Progres_per_Kecamatan.zip",
+                        mime="application/zip",
+                        on_click="ignore",
+                        use_container_width=True
+                    )
 
+    bundle_section()
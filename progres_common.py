@@ -0,0 +1,694 @@
+"""
+Helper bersama halaman Rekap Progres dan Pivot Progres, tanpa Streamlit.
+
+Dulu helper ini disalin di tiap halaman. Streamlit menjalankan setiap
+halaman sebagai __main__, sehingga fungsi cache dengan sumber yang sama
+di dua halaman berbagi entri cache. Di modul ini setiap fungsi hanya
+ada satu kali, dan fungsinya bisa di-pickle ke worker ProcessPoolExecutor.
+"""
+import io
+import os
+import hashlib
+import tempfile
+import time
+
+from operator import itemgetter
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+from reportlab.platypus import PageBreak, LongTable
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.lib import colors
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.lib.enums import TA_LEFT, TA_RIGHT, TA_CENTER
+from openpyxl import load_workbook
+from openpyxl.styles import Font, PatternFill, Border, Side, Alignment, NamedStyle
+from openpyxl.styles.fonts import DEFAULT_FONT
+from openpyxl.utils import get_column_letter
+
+
+# =========================
+# READ MASTER (STREAMING)
+# =========================
+# Kolom yang dipakai beserta dtype-nya.
+# Kategori disimpan sebagai kode integer, jumlah cukup int32.
+MASTER_SCHEMA = {
+    "NPSN": "object",
+    "BP": "category",
+    "Status": "category",
+    "Last Sync": "object",
+    "Kecamatan": "category",
+    "PD": "int32",
+    "Rombel": "int32",
+    "Guru": "int32",
+    "Tendik": "int32",
+}
+
+
+def master_series(values, dtype):
+    if dtype == "category":
+        return pd.Series(pd.Categorical(values))
+    if pd.api.types.is_integer_dtype(dtype):
+        return pd.to_numeric(pd.Series(values), errors="coerce").fillna(0).astype(dtype)
+    return pd.Series(values, dtype=dtype)
+
+
+def read_master_sheet(file_bytes, sheet_name, schema):
+    """
+    Baca sheet baris per baris (read-only) dan simpan hanya kolom
+    yang ada di schema, langsung dengan dtype dari schema.
+    """
+    columns = list(schema)
+
+    wb = load_workbook(io.BytesIO(file_bytes), read_only=True, data_only=True)
+
+    try:
+        ws = wb[sheet_name]
+        header = next(ws.iter_rows(max_row=1, values_only=True), ())
+
+        missing = [col for col in columns if col not in header]
+        if missing:
+            raise ValueError(
+                f"Kolom tidak ditemukan di sheet {sheet_name}: {', '.join(missing)}"
+            )
+
+        positions = [header.index(col) for col in columns]
+        min_col = min(positions)
+        pick = itemgetter(*[pos - min_col for pos in positions])
+
+        values = {col: [] for col in columns}
+        for row in ws.iter_rows(
+            min_row=2,
+            min_col=min_col + 1,
+            max_col=max(positions) + 1,
+            values_only=True
+        ):
+            picked = pick(row)
+            # Lewati baris kosong (biasanya sisa format di akhir sheet)
+            if all(value is None for value in picked):
+                continue
+            for col, value in zip(columns, picked):
+                values[col].append(value)
+    finally:
+        wb.close()
+
+    return pd.DataFrame({
+        col: master_series(values[col], dtype)
+        for col, dtype in schema.items()
+    })
+
+
+# =========================
+# SP UNIK (KODE INTEGER)
+# =========================
+def distinct_pairs(group_codes, npsn_codes, mask=None):
+    """
+    Pasangan unik (kode group, kode NPSN) dari dua array integer.
+    Kode -1 (NaN) diabaikan, mask opsional membatasi baris yang dihitung.
+    """
+    valid = (group_codes >= 0) & (npsn_codes >= 0)
+    if mask is not None:
+        valid &= mask
+
+    n_npsn = int(npsn_codes.max(initial=-1)) + 1
+    pairs = np.unique(
+        group_codes[valid].astype(np.int64) * n_npsn + npsn_codes[valid]
+    )
+
+    return pairs // max(n_npsn, 1), pairs % max(n_npsn, 1)
+
+
+def count_distinct(group_codes, n_groups, npsn_codes, mask=None):
+    """Jumlah NPSN unik per kode group (panjang hasil = n_groups)."""
+    groups, _ = distinct_pairs(group_codes, npsn_codes, mask)
+    return np.bincount(groups, minlength=n_groups)
+
+
+# =========================
+# ARTIFACT CACHE (DISK)
+# =========================
+ARTIFACT_DIR = Path("artifacts")
+ARTIFACT_TTL_SECONDS = 24 * 60 * 60       # satu hari pelaporan
+ARTIFACT_MAX_BYTES = 512 * 1024 * 1024    # batas total ukuran folder
+
+# Naikkan jika tampilan Excel/PDF berubah tanpa perubahan data,
+# supaya artifact lama tidak dipakai lagi
+REPORT_LAYOUT_VERSION = 2
+
+
+def artifact_path(fingerprint, layout, file_name):
+    """
+    Lokasi artifact untuk kombinasi data + konfigurasi laporan.
+    layout berbeda per halaman, jadi nama file yang sama
+    di dua halaman tidak saling menimpa.
+    """
+    key = hashlib.sha256(
+        f"{fingerprint}|{REPORT_LAYOUT_VERSION}|{layout}|{file_name}".encode()
+    ).hexdigest()[:32]
+    return ARTIFACT_DIR / f"{key}_{file_name}"
+
+
+def evict_artifacts():
+    """Hapus artifact yang lewat TTL, lalu yang tertua jika melebihi batas ukuran"""
+    now = time.time()
+    files = []
+
+    for path in ARTIFACT_DIR.glob("*"):
+        # File .tmp sedang ditulis oleh worker lain
+        if path.suffix == ".tmp":
+            continue
+
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+
+        if now - stat.st_mtime > ARTIFACT_TTL_SECONDS:
+            path.unlink(missing_ok=True)
+        else:
+            files.append((stat.st_mtime, stat.st_size, path))
+
+    total_bytes = sum(size for _, size, _ in files)
+
+    for _, size, path in sorted(files):
+        if total_bytes <= ARTIFACT_MAX_BYTES:
+            break
+        path.unlink(missing_ok=True)
+        total_bytes -= size
+
+
+def cached_artifact(fingerprint, layout, file_name, render):
+    """
+    Baca artifact dari disk jika masih berlaku,
+    jika tidak render() lalu simpan hasilnya.
+    """
+    path = artifact_path(fingerprint, layout, file_name)
+
+    try:
+        if time.time() - path.stat().st_mtime <= ARTIFACT_TTL_SECONDS:
+            return path.read_bytes()
+    except FileNotFoundError:
+        pass
+
+    data = render()
+
+    # Tulis ke file sementara lalu rename, supaya sesi lain
+    # tidak pernah membaca artifact yang setengah jadi
+    ARTIFACT_DIR.mkdir(exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=ARTIFACT_DIR, suffix=".tmp", delete=False) as tmp:
+        tmp.write(data)
+    os.replace(tmp.name, path)
+
+    evict_artifacts()
+
+    return data
+
+
+def render_artifact(fingerprint, layout, file_name, render, content):
+    """
+    Dijalankan di worker ProcessPoolExecutor: render(content) lewat
+    artifact cache. render harus fungsi level modul agar bisa di-pickle.
+    """
+    return cached_artifact(fingerprint, layout, file_name, lambda: render(content))
+
+
+# =========================
+# FORMAT NUMERIC FUNCTION
+# =========================
+def format_number(value):
+    if pd.isna(value):
+        return ""
+    if isinstance(value, (int, np.integer)):
+        return f"{value:,}"
+    if isinstance(value, (float, np.floating)):
+        return f"{value:,.2f}"
+    return str(value)
+
+
+# =========================
+# PDF TABLE CONFIG
+# =========================
+PDF_CELL_PADDING = 6        # padding kiri/kanan default reportlab Table
+PDF_LONG_TABLE_ROWS = 200   # di atas ini pakai LongTable
+
+
+# =========================================
+# GLOBAL STYLE CONFIG
+# =========================================
+HEADER_FILL = PatternFill("solid", fgColor="1F4E78")
+HEADER_FONT = Font(color="FFFFFF", bold=True)
+TITLE_FONT = Font(size=14, bold=True)
+TOTAL_FILL = PatternFill("solid", fgColor="FFF2CC")
+TOTAL_FONT = Font(bold=True)
+THIN_BORDER = Border(
+    left=Side(style="thin"),
+    right=Side(style="thin"),
+    top=Side(style="thin"),
+    bottom=Side(style="thin"),
+)
+NUMBER_FORMAT_INTEGER = '#,##0'
+NUMBER_FORMAT_DECIMAL = '#,##0.00'
+NUMBER_FORMAT_PERCENT = '0.00%'
+NUMBER_FORMAT_GENERAL = 'General'
+
+
+# =========================================
+# NAMED STYLE TABEL
+# =========================================
+def column_number_format(series, col_name):
+    """Format angka satu kolom, ditentukan sekali per kolom"""
+    if pd.api.types.is_integer_dtype(series):
+        return NUMBER_FORMAT_INTEGER
+
+    if pd.api.types.is_float_dtype(series):
+        # Jika kolom persentase
+        if "%" in col_name.lower() or "persen" in col_name.lower():
+            return NUMBER_FORMAT_PERCENT
+        return NUMBER_FORMAT_DECIMAL
+
+    return NUMBER_FORMAT_GENERAL
+
+
+def table_style(wb, kind, horizontal="center", number_format=NUMBER_FORMAT_GENERAL):
+    """
+    kind : "header", "body" atau "total"
+    Named style didaftarkan sekali per workbook lalu dipakai bersama
+    oleh semua sel dengan format yang sama.
+    """
+    name = f"tabel_{kind}_{horizontal}_{number_format}"
+
+    if name not in wb.named_styles:
+        style = NamedStyle(
+            name=name,
+            font=DEFAULT_FONT,
+            border=THIN_BORDER,
+            number_format=number_format
+        )
+
+        if kind == "header":
+            style.fill = HEADER_FILL
+            style.font = HEADER_FONT
+            style.alignment = Alignment(horizontal="center", vertical="center")
+        else:
+            style.alignment = Alignment(horizontal=horizontal)
+
+        if kind == "total":
+            style.fill = TOTAL_FILL
+            style.font = TOTAL_FONT
+
+        wb.add_named_style(style)
+
+    return name
+
+
+def column_widths(df):
+    """Lebar kolom dari panjang teks header dan isi dataframe"""
+    widths = []
+
+    for col_name in df.columns:
+        values = df[col_name].astype(object)
+        values = values[values.notna() & values.ne(0) & values.ne("")]
+
+        max_len = len(str(col_name)) if col_name else 0
+        if len(values):
+            max_len = max(max_len, values.astype(str).str.len().max())
+
+        widths.append(max_len + 3)
+
+    return widths
+
+
+# =========================================
+# LAYOUT PLANNER
+# =========================================
+def plan_table_layout(tables, spacing=4):
+    """
+    Tentukan posisi akhir judul, header, data, dan total tiap tabel
+    sebelum ada sel yang ditulis (1-based Excel).
+    """
+    layouts = []
+    current_row = 1
+
+    for df, title in tables:
+        title_row = current_row if title else None
+        header_row = current_row + 1 if title else current_row
+        data_start = header_row + 1
+        total_row = data_start + len(df) - 1
+
+        layouts.append({
+            "title_row": title_row,
+            "header_row": header_row,
+            "data_start": data_start,
+            "total_row": total_row,
+        })
+
+        # Update posisi berikutnya
+        current_row += len(df) + spacing + 2
+
+    return layouts
+
+
+# =========================================
+# WRITE TABLE FUNCTION
+# =========================================
+def write_table(ws, layout, df, title=None):
+    """
+    layout : posisi baris dari plan_table_layout
+    df     : dataframe
+    Setiap sel ditulis sekali, lengkap dengan nilai dan style-nya.
+    """
+
+    n_cols = len(df.columns)
+    header_row = layout["header_row"]
+    data_start = layout["data_start"]
+    total_row = layout["total_row"]
+
+    # =========================
+    # TITLE
+    # =========================
+    if title:
+        title_row = layout["title_row"]
+        ws.cell(row=title_row, column=1, value=title).font = TITLE_FONT
+        ws.merge_cells(
+            start_row=title_row,
+            start_column=1,
+            end_row=title_row,
+            end_column=n_cols
+        )
+
+    wb = ws.parent
+
+    # =========================
+    # HEADER
+    # =========================
+    header_style = table_style(wb, "header")
+    for col, col_name in enumerate(df.columns, start=1):
+        ws.cell(row=header_row, column=col, value=col_name).style = header_style
+
+    # Style per kolom ditentukan sekali
+    body_styles = []
+    total_styles = []
+    for col, col_name in enumerate(df.columns, start=1):
+        horizontal = "left" if col == 1 else "right"
+        number_format = column_number_format(df[col_name], col_name)
+        body_styles.append(table_style(wb, "body", horizontal, number_format))
+        total_styles.append(table_style(wb, "total", horizontal, number_format))
+
+    # =========================
+    # DATA + TOTAL
+    # =========================
+    values = df.astype(object).where(df.notna(), None)
+
+    for row, record in enumerate(values.itertuples(index=False, name=None), start=data_start):
+        row_styles = total_styles if row == total_row else body_styles
+
+        for col, (value, style) in enumerate(zip(record, row_styles), start=1):
+            ws.cell(row=row, column=col, value=value).style = style
+
+    # =========================
+    # AUTO WIDTH (Only Table Range)
+    # =========================
+    for col, width in enumerate(column_widths(df), start=1):
+        ws.column_dimensions[get_column_letter(col)].width = width
+
+
+# =========================================
+# WRITE MULTIPLE TABLES
+# =========================================
+def write_tables(writer, sheet_name, tables, spacing=4):
+
+    ws = writer.book.create_sheet(sheet_name)
+    writer.sheets[sheet_name] = ws
+
+    layouts = plan_table_layout(tables, spacing)
+
+    for (df, title), layout in zip(tables, layouts):
+        write_table(
+            ws=ws,
+            layout=layout,
+            df=df,
+            title=title
+        )
+
+
+def render_excel_report(sheets):
+    """sheets : {nama sheet: [(df, judul), ...]}"""
+    excel_buffer = io.BytesIO()
+
+    with pd.ExcelWriter(excel_buffer, engine="openpyxl") as writer:
+        for sheet_name, sheet_tables in sheets.items():
+            write_tables(writer, sheet_name, sheet_tables)
+
+    return excel_buffer.getvalue()
+
+
+# =========================
+# EXPORT PDF (IN MEMORY)
+# =========================
+def format_pdf_column(series, format_number):
+    """Format satu kolom sekaligus menjadi teks (tanpa Paragraph)"""
+    if pd.api.types.is_integer_dtype(series):
+        return series.map("{:,}".format).tolist()
+
+    if pd.api.types.is_float_dtype(series):
+        text = series.map("{:,.2f}".format)
+        return text.where(series.notna(), "").tolist()
+
+    return series.map(format_number).tolist()
+
+
+def fit_pdf_cells(texts, width, style):
+    """
+    Teks biasa jika muat di lebar kolom,
+    Paragraph (dibungkus) hanya untuk kolom yang tidak muat.
+    """
+    text_width = max(
+        (stringWidth(text, style.fontName, style.fontSize) for text in set(texts)),
+        default=0
+    )
+
+    if text_width > width - 2 * PDF_CELL_PADDING:
+        return [Paragraph(text, style) for text in texts]
+
+    return texts
+
+
+def build_pdf_table(elements, df, title, doc, styles,
+                header_style, cell_left, cell_right,
+                format_number,
+                landscape_mode=True,
+                add_page_break=True):
+
+    # Optional title
+    if title:
+        elements.append(Paragraph(title, styles["Title"]))
+        elements.append(Spacer(1, 12))
+
+    # =====================
+    # Column Width
+    # =====================
+    if landscape_mode:
+        page_width, _ = landscape(A4)
+    else:
+        page_width, _ = A4
+
+    usable_width = page_width - doc.leftMargin - doc.rightMargin
+    num_cols = len(df.columns)
+
+    ratio = [2.5] + [1] * (num_cols - 1)
+    total_ratio = sum(ratio)
+
+    col_widths = [(r / total_ratio) * usable_width for r in ratio]
+
+    # =====================
+    # Build Data
+    # =====================
+
+    # Header: Paragraph hanya jika teks perlu dibungkus
+    header = [
+        fit_pdf_cells([str(col)], width, header_style)[0]
+        for col, width in zip(df.columns, col_widths)
+    ]
+
+    # Rows: diformat per kolom, kolom pertama apa adanya
+    columns = [
+        fit_pdf_cells(df.iloc[:, 0].astype(str).tolist(), col_widths[0], cell_left)
+    ]
+    columns += [
+        fit_pdf_cells(
+            format_pdf_column(df.iloc[:, i], format_number),
+            col_widths[i],
+            cell_right
+        )
+        for i in range(1, num_cols)
+    ]
+
+    data = [header] + [list(row) for row in zip(*columns)]
+
+    # =====================
+    # Create Table
+    # =====================
+    # Tabel panjang (banyak halaman) pakai LongTable
+    table_class = LongTable if len(df) > PDF_LONG_TABLE_ROWS else Table
+    table = table_class(data, colWidths=col_widths, repeatRows=1)
+
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), header_style.textColor),
+        ('FONTNAME', (0, 0), (-1, 0), header_style.fontName),
+        ('FONTSIZE', (0, 0), (-1, 0), header_style.fontSize),
+        ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+        ('FONTNAME', (0, 1), (-1, -1), cell_left.fontName),
+        ('FONTSIZE', (0, 1), (-1, -1), cell_left.fontSize),
+        ('ALIGN', (0, 1), (0, -1), 'LEFT'),
+        ('ALIGN', (1, 1), (-1, -1), 'RIGHT'),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ]))
+
+    elements.append(table)
+    elements.append(Spacer(1, 24))
+
+    if add_page_break:
+        elements.append(PageBreak())
+
+def render_pdf_report(pdf_tables):
+    """pdf_tables : [(df, judul), ...]"""
+    pdf_buffer = io.BytesIO()
+
+    doc = SimpleDocTemplate(
+        pdf_buffer,
+        pagesize=landscape(A4),
+        leftMargin=1 * inch,
+        rightMargin=0.8 * inch,
+        topMargin=0.8 * inch,
+        bottomMargin=0.8 * inch
+    )
+
+    elements = []
+    styles = getSampleStyleSheet()
+
+    # =========================
+    # STYLE
+    # =========================
+    cell_left = ParagraphStyle(
+        name='cell_left',
+        parent=styles['Normal'],
+        fontSize=8,
+        alignment=TA_LEFT
+    )
+
+    cell_right = ParagraphStyle(
+        name='cell_right',
+        parent=styles['Normal'],
+        fontSize=8,
+        alignment=TA_RIGHT
+    )
+
+    header_style = ParagraphStyle(
+        name='header_style',
+        parent=styles['Normal'],
+        fontName='Helvetica-Bold',
+        fontSize=8,
+        textColor=colors.white,
+        alignment=TA_CENTER
+    )
+
+    for i, (df, title) in enumerate(pdf_tables):
+
+        build_pdf_table(
+            elements=elements,
+            df=df,
+            title=title,
+            doc=doc,
+            styles=styles,
+            header_style=header_style,
+            cell_left=cell_left,
+            cell_right=cell_right,
+            format_number=format_number,
+            add_page_break=(i < len(pdf_tables) - 1)  # No page break at last table
+        )
+
+    # =========================
+    # BUILD PDF
+    # =========================
+    doc.build(elements)
+
+    return pdf_buffer.getvalue()
+
+
+# =========================
+# FILTER (INDEX POSISI BARIS)
+# =========================
+# Kolom kategori yang bisa difilter -> label di sidebar
+FILTER_COLUMNS = {
+    "Kecamatan": "Kecamatan",
+    "BP": "Bentuk Pendidikan",
+    "Status": "Negeri/Swasta",
+}
+
+
+def filter_index(rows):
+    """
+    Hasil : {kolom: {nilai kategori: posisi baris (terurut)}}
+    Dibangun dari kode kategori: satu argsort per kolom,
+    lalu dipotong per kode. Di-cache oleh halaman bersama
+    data yang sudah disiapkan.
+    """
+    index = {}
+
+    for column in FILTER_COLUMNS:
+        values = rows[column]
+        codes = values.cat.codes.to_numpy()
+        order = np.argsort(codes, kind="stable")
+        bounds = np.searchsorted(
+            codes[order], np.arange(len(values.cat.categories) + 1)
+        )
+
+        index[column] = {
+            value: order[start:end]
+            for value, start, end in zip(values.cat.categories, bounds[:-1], bounds[1:])
+            if end > start
+        }
+
+    return index
+
+
+def select_positions(index, selection):
+    """
+    selection : {kolom: [nilai terpilih]}, kolom tanpa pilihan = semua
+    Hasil     : posisi baris terpilih (irisan antar kolom, gabungan
+                antar nilai dalam satu kolom), None jika tanpa filter.
+    """
+    positions = None
+
+    for column, values in selection.items():
+        if not values:
+            continue
+
+        # Posisi tiap nilai saling lepas, cukup digabung lalu diurutkan
+        chosen = np.sort(np.concatenate([index[column][value] for value in values]))
+
+        positions = chosen if positions is None else np.intersect1d(
+            positions, chosen, assume_unique=True
+        )
+
+    return positions
+
+
+def filter_fingerprint(file_hash, selection):
+    """Fingerprint data + filter, dipakai sebagai kunci cache turunan"""
+    chosen = sorted(
+        (column, sorted(map(str, values)))
+        for column, values in selection.items() if values
+    )
+
+    if not chosen:
+        return file_hash
+
+    return hashlib.sha256(f"{file_hash}|{chosen}".encode()).hexdigest()
@@ -0,0 +1,173 @@
+"""
+Helper Streamlit bersama halaman Rekap Progres dan Pivot Progres.
+
+Bagian tanpa Streamlit ada di progres_common.py.
+"""
+import streamlit as st
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from progres_common import (
+    FILTER_COLUMNS,
+    render_artifact,
+    render_excel_report,
+    render_pdf_report,
+)
+
+
+# =========================
+# FILTER PANEL
+# =========================
+def filter_panel(index):
+    """Multiselect per kolom di sidebar, hasil: {kolom: [nilai terpilih]}"""
+    selection = {}
+
+    with st.sidebar.expander("🔎 Filter Data", expanded=True):
+        for column, label in FILTER_COLUMNS.items():
+            counts = {value: len(positions) for value, positions in index[column].items()}
+
+            selection[column] = st.multiselect(
+                label,
+                list(counts),
+                format_func=lambda value, counts=counts: f"{value} ({counts[value]:,})",
+                placeholder="Semua",
+                key=f"filter_{column}"
+            )
+
+    return selection
+
+
+# =========================
+# EXPORT WORKER
+# =========================
+EXPORT_POLL_SECONDS = 1
+EXPORT_FILE_NAME = "Rekap_Progres_SYNC_DAPODIK"
+
+
+@st.cache_resource
+def export_pool():
+    """
+    Worker bersama untuk render Excel dan PDF di latar belakang.
+    Proses, bukan thread: render openpyxl/reportlab terikat CPU,
+    dua thread hanya bergantian memegang GIL.
+    """
+    return ProcessPoolExecutor(max_workers=2)
+
+
+def failed_jobs(jobs):
+    """{nama job: exception} untuk job yang selesai dengan error"""
+    return {
+        name: job.exception() for name, job in jobs.items()
+        if job.done() and job.exception() is not None
+    }
+
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def export_jobs(fingerprint, layout, _sheets, _tables):
+    """
+    fingerprint : hash data + filter (kunci cache)
+    layout      : sidik konfigurasi laporan, berbeda per halaman (kunci cache)
+    _sheets     : {nama sheet: [(df, judul), ...]} (tidak ikut di-hash)
+    _tables     : [(df, judul), ...] untuk PDF (tidak ikut di-hash)
+
+    Excel dan PDF dirender bersamaan di export_pool. Job disimpan
+    per kunci, jadi rerun tidak mengulang render.
+    """
+    pool = export_pool()
+    return {
+        "excel": pool.submit(
+            render_artifact, fingerprint, layout, f"{EXPORT_FILE_NAME}.xlsx",
+            render_excel_report, _sheets
+        ),
+        "pdf": pool.submit(
+            render_artifact, fingerprint, layout, f"{EXPORT_FILE_NAME}.pdf",
+            render_pdf_report, _tables
+        ),
+    }
+
+
+# =========================
+# DOWNLOAD SECTION
+# =========================
+# Tombol siapkan/download hanya me-rerun bagian ini
+@st.fragment(key="download_section")
+def download_section(fingerprint, layout, sheets, tables):
+    st.markdown("### 📥 Download Laporan")
+
+    # Fingerprint laporan yang diminta, terpisah per konfigurasi laporan (halaman)
+    export_key = f"export_fingerprint_{layout}"
+
+    if st.button("⚙️ Siapkan Laporan", use_container_width=True):
+        st.session_state[export_key] = fingerprint
+
+    if st.session_state.get(export_key) != fingerprint:
+        return
+
+    jobs = export_jobs(fingerprint, layout, sheets, tables)
+    failed = failed_jobs(jobs)
+
+    if failed:
+        # Future yang gagal tidak boleh tertahan di cache_resource,
+        # dibuang agar "Siapkan Laporan" bisa mencoba lagi
+        export_jobs.clear()
+        st.session_state.pop(export_key, None)
+
+        # Worker mati (mis. kehabisan memori): pool tidak bisa dipakai lagi
+        if any(isinstance(error, BrokenProcessPool) for error in failed.values()):
+            export_pool.clear()
+
+        for name, error in failed.items():
+            st.error(f"Gagal membuat laporan {name.upper()}: {error}")
+
+        return
+
+    pending = not all(job.done() for job in jobs.values())
+
+    # Panel dipolling selama masih ada laporan yang dirender.
+    # Setelah semua selesai, download_section di-rerun sekali
+    # sehingga panel dibuat ulang tanpa polling.
+    @st.fragment(run_every=EXPORT_POLL_SECONDS if pending else None)
+    def download_panel():
+
+        done = sum(job.done() for job in jobs.values())
+
+        # Selesai atau ada yang gagal: bagian download dibuat ulang
+        if pending and (done == len(jobs) or failed_jobs(jobs)):
+            st.rerun(scope="download_section")
+
+        if done < len(jobs):
+            st.progress(
+                done / len(jobs),
+                text=f"Menyiapkan laporan... ({done}/{len(jobs)} selesai)"
+            )
+
+        col1, col2 = st.columns(2)
+
+        with col1:
+            if jobs["excel"].done():
+                st.download_button(
+                    label="📊 Download Excel",
+                    data=jobs["excel"].result(),
+                    file_name=f"{EXPORT_FILE_NAME}.xlsx",
+                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                    on_click="ignore",
+                    use_container_width=True
+                )
+            else:
+                st.button("⏳ Excel diproses...", disabled=True, use_container_width=True)
+
+        with col2:
+            if jobs["pdf"].done():
+                st.download_button(
+                    label="📄 Download PDF",
+                    data=jobs["pdf"].result(),
+                    file_name=f"{EXPORT_FILE_NAME}.pdf",
+                    mime="application/pdf",
+                    on_click="ignore",
+                    use_container_width=True
+                )
+            else:
+                st.button("⏳ PDF diproses...", disabled=True, use_container_width=True)
+
+    download_panel()
@@ -0,0 +1,375 @@
+"""
+Agregasi dan spesifikasi laporan Rekap Progres, tanpa Streamlit.
+
+Dipisah dari pages/rekap_Progres.py supaya bisa dijalankan di worker
+ProcessPoolExecutor: fungsi yang didefinisikan di script halaman
+tidak bisa di-pickle ke proses lain. Render Excel/PDF ada di
+progres_common.py, dipakai bersama halaman Pivot Progres.
+"""
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from progres_common import (
+    distinct_pairs,
+    count_distinct,
+    render_excel_report,
+    render_pdf_report,
+)
+
+
+# =========================
+# CUBE KECAMATAN x BP x STATUS
+# =========================
+CUBE_KEYS = ["Kecamatan", "BP", "Status"]
+CUBE_MEASURES = ["SP", "Sudah_SYNC", "Belum_SYNC", "PD", "Rombel", "Guru", "Tendik", "Jml_GTK"]
+
+
+def build_cube(rows):
+    """
+    Satu baris per (Kecamatan, BP, Status) berisi jumlah SP,
+    Sudah/Belum SYNC dan total PD/Rombel/Guru/Tendik/GTK.
+    Semua tabel rekap diturunkan dari cube ini.
+    """
+    grouped = rows.groupby(CUBE_KEYS, observed=True, dropna=False)
+
+    cube = (
+        grouped
+        .agg(
+            Sudah_SYNC=("Sudah_SYNC", "sum"),
+            Belum_SYNC=("Belum_SYNC", "sum"),
+            PD=("PD", "sum"),
+            Rombel=("Rombel", "sum"),
+            Guru=("Guru", "sum"),
+            Tendik=("Tendik", "sum"),
+            Jml_GTK=("Jml_GTK", "sum")
+        )
+        .reset_index()
+    )
+
+    # SP = jumlah NPSN unik per sel, dihitung dari kode integer
+    cells, npsn = distinct_pairs(
+        grouped.ngroup().to_numpy(), rows["NPSN_Kode"].to_numpy()
+    )
+    cube.insert(len(CUBE_KEYS), "SP", np.bincount(cells, minlength=len(cube)))
+
+    # SP per sel hanya boleh dijumlahkan saat roll-up
+    # jika setiap NPSN tercatat di satu sel saja
+    sp_additive = not (np.bincount(npsn) > 1).any()
+
+    return cube, sp_additive
+
+
+# =========================
+# AGGREGATION ENGINE
+# =========================
+# Nama kolom hasil -> (measure cube, filter Status)
+MEASURES = {
+    "SP": ("SP", None),
+    "Jml_SP": ("SP", None),
+    "SP_Negeri": ("SP", "NEGERI"),
+    "SP_Swasta": ("SP", "SWASTA"),
+
+    "Sudah_SYNC": ("Sudah_SYNC", None),
+    "Belum_SYNC": ("Belum_SYNC", None),
+
+    "PD": ("PD", None),
+    "Jml_PD": ("PD", None),
+    "PD_Negeri": ("PD", "NEGERI"),
+    "PD_Swasta": ("PD", "SWASTA"),
+
+    "Rombel": ("Rombel", None),
+    "Jml_Rombel": ("Rombel", None),
+    "Rombel_Negeri": ("Rombel", "NEGERI"),
+    "Rombel_Swasta": ("Rombel", "SWASTA"),
+
+    "Guru": ("Guru", None),
+    "Jml_Guru": ("Guru", None),
+    "Guru_Negeri": ("Guru", "NEGERI"),
+    "Guru_Swasta": ("Guru", "SWASTA"),
+
+    "Tendik": ("Tendik", None),
+    "Jml_Tendik": ("Tendik", None),
+    "Tendik_Negeri": ("Tendik", "NEGERI"),
+    "Tendik_Swasta": ("Tendik", "SWASTA"),
+
+    "Jml_GTK": ("Jml_GTK", None),
+    "Jml_GTK_Negeri": ("Jml_GTK", "NEGERI"),
+    "Jml_GTK_Swasta": ("Jml_GTK", "SWASTA"),
+}
+
+STATUSES = ["NEGERI", "SWASTA"]
+
+NS_MEASURES = [
+    "SP_Negeri", "SP_Swasta", "Jml_SP",
+    "PD_Negeri", "PD_Swasta", "Jml_PD",
+    "Rombel_Negeri", "Rombel_Swasta", "Jml_Rombel",
+    "Guru_Negeri", "Guru_Swasta", "Jml_Guru",
+    "Tendik_Negeri", "Tendik_Swasta", "Jml_Tendik",
+    "Jml_GTK_Negeri", "Jml_GTK_Swasta", "Jml_GTK",
+]
+
+# =========================
+# SPESIFIKASI LAPORAN
+# =========================
+# Satu sumber untuk grid, Excel, dan PDF:
+# id tabel -> sumber agregasi (jenjang/BP atau None untuk semua, kolom group),
+# urutan kolom, nama tampilan (opsional), sheet/kelompok tab, dan judul
+REPORT_SPECS = {
+    "per_kec": {
+        "jenjang": None,
+        "key": "Kecamatan",
+        "columns": ["SP", "Sudah_SYNC", "Belum_SYNC", "PD", "Rombel", "Guru", "Tendik", "Jml_GTK"],
+        "sheet": "Rekap_Master",
+        "tab": "📊 Rekap Per Kecamatan",
+        "grid_key": "grid_kec",
+        "excel_title": "Rekapitulasi Progres SYNC DAPODIK per Kecamatan",
+        "title": "Rekapitulasi Progres SYNC DAPODIK per Kecamatan",
+    },
+    "per_kec_NS": {
+        "jenjang": None,
+        "key": "Kecamatan",
+        "columns": NS_MEASURES,
+        "sheet": "Rekap_Master",
+        "tab": "🏫 Rekap Negeri/Swasta Per Kecamatan",
+        "grid_key": "grid_kec_ns",
+        "excel_title": "Rekapitulasi SYNC Negeri/Swasta per Kecamatan",
+        "title": "Rekapitulasi Progres SYNC DAPODIK Negeri/Swasta per Kecamatan",
+    },
+    "per_bp_NS": {
+        "jenjang": None,
+        "key": "BP",
+        "columns": NS_MEASURES,
+        "sheet": "Rekap_Master",
+        "tab": "📌 Rekap Negeri/Swasta Per BP",
+        "grid_key": "grid_bp_ns",
+        "excel_title": "Rekapitulasi SYNC Negeri/Swasta per Jenjang",
+        "title": "Rekapitulasi Progres SYNC DAPODIK Negeri/Swasta per Jenjang",
+    },
+
+    "per_kec_SMP": {
+        "jenjang": "SMP",
+        "key": "Kecamatan",
+        "columns": ["SP", "Sudah_SYNC", "Belum_SYNC", "PD", "Rombel", "Guru", "Tendik", "Jml_GTK"],
+        "sheet": "Eksplorasi_SMP",
+        "tab": "📊 DAPODIK SMP",
+        "grid_key": "grid_kec_smp",
+        "excel_title": "Eksplorasi Progres SMP per Kecamatan",
+        "title": "Eksplorasi Progres DAPODIK SMP per Kecamatan",
+    },
+    "per_kec_SP_SMP": {
+        "jenjang": "SMP",
+        "key": "Kecamatan",
+        "columns": ["Jml_SP", "SP_Negeri", "SP_Swasta", "Sudah_SYNC", "Belum_SYNC"],
+        "sheet": "Eksplorasi_SMP",
+        "tab": "🏫 SP dan SYNC SMP",
+        "grid_key": "grid_kec_sp_smp",
+        "excel_title": "Eksplorasi SP & SYNC SMP",
+        "title": "Eksplorasi Progres SP dan SYNC SMP per Kecamatan",
+    },
+    "per_kec_PDRombel_SMP": {
+        "jenjang": "SMP",
+        "key": "Kecamatan",
+        "columns": ["PD_Negeri", "PD_Swasta", "Jml_PD", "Rombel_Negeri", "Rombel_Swasta", "Jml_Rombel"],
+        "sheet": "Eksplorasi_SMP",
+        "tab": "📌 PD dan Rombel SMP",
+        "grid_key": "grid_kec_pdrombel_smp",
+        "excel_title": "Eksplorasi PD & Rombel SMP",
+        "title": "Eksplorasi Progres PD dan Rombel SMP per Kecamatan",
+    },
+    "per_kec_GTK_SMP": {
+        "jenjang": "SMP",
+        "key": "Kecamatan",
+        "columns": [
+            "Jml_GTK", "Guru_Negeri", "Guru_Swasta", "Jml_Guru",
+            "Tendik_Negeri", "Tendik_Swasta", "Jml_Tendik",
+        ],
+        "sheet": "Eksplorasi_SMP",
+        "tab": "📌 Progres GTK SMP",
+        "grid_key": "grid_kec_gtk_smp",
+        "excel_title": "Eksplorasi GTK SMP",
+        "title": "Eksplorasi Progres GTK SMP per Kecamatan",
+    },
+    "per_kec_ALL_SMP": {
+        "jenjang": "SMP",
+        "key": "Kecamatan",
+        "columns": [
+            "SP_Negeri", "SP_Swasta", "PD_Negeri", "PD_Swasta",
+            "Rombel_Negeri", "Rombel_Swasta", "Guru_Negeri", "Guru_Swasta", "Jml_Guru",
+            "Tendik_Negeri", "Tendik_Swasta",
+            "Jml_SP", "Jml_PD", "Jml_Rombel", "Jml_Tendik", "Jml_GTK",
+        ],
+        "sheet": "Eksplorasi_SMP",
+        "tab": "📌 ALL DAPODIK SMP",
+        "grid_key": "grid_kec_all_smp",
+        "excel_title": "Eksplorasi ALL SMP",
+        "title": "Eksplorasi Progres ALL DAPODIK SMP per Kecamatan",
+    },
+}
+
+# Urutan sheet Excel / kelompok tab
+REPORT_SHEETS = list(dict.fromkeys(spec["sheet"] for spec in REPORT_SPECS.values()))
+
+# Sidik konfigurasi laporan, ikut menjadi kunci artifact cache
+REPORT_LAYOUT = hashlib.sha256(repr(REPORT_SPECS).encode()).hexdigest()[:16]
+
+
+def rollup_cube(cube, rows, sp_additive, key, jenjang=None):
+    """
+    Roll-up cube ke satu kolom group (opsional dibatasi satu jenjang).
+    Hasil: (total semua Status, {Status: total per Status}).
+    """
+    part = cube if jenjang is None else cube.loc[cube["BP"] == jenjang]
+
+    totals = part.groupby(key, observed=True)[CUBE_MEASURES].sum()
+    by_status = {
+        status: (
+            part.loc[part["Status"] == status]
+            .groupby(key, observed=True)[CUBE_MEASURES]
+            .sum()
+            .reindex(totals.index, fill_value=0)
+        )
+        for status in STATUSES
+    }
+
+    # NPSN muncul di lebih dari satu sel: SP dihitung ulang dari baris,
+    # memakai kode kategori kolom group + kode NPSN dan mask per Status
+    if not sp_additive:
+        key_codes = rows[key].cat.codes.to_numpy()
+        n_keys = len(rows[key].cat.categories)
+        npsn_codes = rows["NPSN_Kode"].to_numpy()
+        index_codes = totals.index.codes
+
+        mask = None if jenjang is None else (rows["BP"] == jenjang).to_numpy()
+
+        totals["SP"] = count_distinct(key_codes, n_keys, npsn_codes, mask)[index_codes]
+        for status in STATUSES:
+            status_mask = (rows["Status"] == status).to_numpy()
+            if mask is not None:
+                status_mask &= mask
+            by_status[status]["SP"] = count_distinct(
+                key_codes, n_keys, npsn_codes, status_mask
+            )[index_codes]
+
+    return totals, by_status
+
+
+def aggregate_tables(rows, specs):
+    """
+    rows  : data per sekolah
+    specs : {id tabel: spesifikasi} (lihat REPORT_SPECS)
+
+    Data mentah hanya di-group sekali menjadi cube.
+    Setiap tabel adalah roll-up / slice dari cube tersebut.
+    """
+    cube, sp_additive = build_cube(rows)
+
+    passes = {}
+    for name, spec in specs.items():
+        passes.setdefault((spec["jenjang"], spec["key"]), []).append(name)
+
+    results = {}
+
+    for (jenjang, key), names in passes.items():
+        totals, by_status = rollup_cube(cube, rows, sp_additive, key, jenjang)
+
+        for name in names:
+            measures = specs[name]["columns"]
+            results[name] = (
+                pd.DataFrame({
+                    measure: (
+                        totals[base] if status is None
+                        else by_status[status][base]
+                    )
+                    for measure, (base, status) in (
+                        (m, MEASURES[m]) for m in measures
+                    )
+                })
+                .reset_index()
+                .sort_values(key)
+            )
+
+    return results
+
+
+# =========================
+# TOTAL ROW
+# =========================
+def add_total_row(df, label_column):
+    df = df.copy()
+
+    # 🔹 Hapus kolom auto id jika ada
+    df = df.loc[:, ~df.columns.str.contains("::auto_unique_id::", case=False)]
+
+    # 🔹 Ambil hanya kolom numerik untuk dijumlahkan
+    numeric_cols = df.select_dtypes(include="number").columns
+
+    # 🔹 Hitung total
+    total_values = df[numeric_cols].sum()
+
+    # 🔹 Buat row total
+    total_row = {col: "" for col in df.columns}
+    total_row[label_column] = "TOTAL"
+
+    for col in numeric_cols:
+        total_row[col] = total_values[col]
+
+    # 🔹 Append ke dataframe
+    df = pd.concat([df, pd.DataFrame([total_row])], ignore_index=True)
+
+    return df
+
+def materialize_reports(tables):
+    """
+    Tabel final (baris TOTAL + nama tampilan), dibuat sekali per run
+    dan dipakai apa adanya oleh grid, Excel, dan PDF.
+    """
+    reports = {}
+
+    for name, df in tables.items():
+        spec = REPORT_SPECS[name]
+        report = add_total_row(df, spec["key"])
+
+        if spec.get("labels"):
+            report = report.rename(columns=spec["labels"])
+
+        reports[name] = report
+
+    return reports
+
+
+# =========================================
+# EXPORT EXECUTION
+# =========================================
+def report_tables(reports):
+    """
+    reports : {id tabel: tabel final dari materialize_reports}
+    Hasil   : (sheet Excel, daftar tabel PDF) sesuai REPORT_SPECS
+    """
+    excel_sheets = {
+        sheet_name: [
+            (reports[name], spec["excel_title"])
+            for name, spec in REPORT_SPECS.items()
+            if spec["sheet"] == sheet_name
+        ]
+        for sheet_name in REPORT_SHEETS
+    }
+
+    pdf_tables = [
+        (reports[name], spec["title"])
+        for name, spec in REPORT_SPECS.items()
+    ]
+
+    return excel_sheets, pdf_tables
+
+
+# =========================
+# BUNDLE PER KECAMATAN
+# =========================
+def render_kecamatan_report(rows):
+    """Excel dan PDF dengan layout yang sama, untuk data satu Kecamatan"""
+    kec_reports = materialize_reports(aggregate_tables(rows, REPORT_SPECS))
+    sheets, pdf_tables = report_tables(kec_reports)
+
+    return render_excel_report(sheets), render_pdf_report(pdf_tables)
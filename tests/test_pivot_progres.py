@@ -0,0 +1,130 @@
+import runpy
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+PAGE = Path(__file__).resolve().parent.parent / "pages" / "pivot_Progres.py"
+
+VALUES = ["SP", "Sudah SYNC", "Belum SYNC", "PD", "Rombel", "Guru", "Tendik", "GTK"]
+
+# aggfunc pivot_table lama (sebelum cube)
+BASELINE_AGGFUNC = {
+    "SP": "nunique",
+    "Sudah SYNC": "count",
+    "Belum SYNC": "count",
+    "PD": "sum",
+    "Rombel": "sum",
+    "Guru": "sum",
+    "Tendik": "sum",
+    "GTK": "sum",
+}
+
+
+@pytest.fixture(scope="module")
+def page():
+    # Tanpa file upload, halaman hanya mendefinisikan fungsi-fungsinya
+    return runpy.run_path(str(PAGE))
+
+
+@pytest.fixture
+def rows():
+    """Kec A: 3 SD (1 belum kirim), Kec B: 2 SMP (semua sudah SYNC)"""
+    rows = pd.DataFrame({
+        "SP": ["1", "2", "3", "4", "5"],
+        "Kecamatan": ["Kec A", "Kec A", "Kec A", "Kec B", "Kec B"],
+        "BP": ["SD", "SD", "SD", "SMP", "SMP"],
+        "Status": ["Negeri", "Swasta", "Negeri", "Negeri", "Swasta"],
+        "Last Sync": ["2025-01-02", "Belum Kirim", "2025-01-03", "2025-01-04", "2025-01-05"],
+        "PD": [100, 50, 80, 200, 150],
+        "Rombel": [6, 3, 5, 9, 7],
+        "Guru": [10, 5, 8, 20, 15],
+        "Tendik": [2, 1, 2, 4, 3],
+    })
+
+    for col in ["Kecamatan", "BP", "Status"]:
+        rows[col] = rows[col].astype("category")
+
+    rows["GTK"] = rows["Guru"] + rows["Tendik"]
+    rows["Sudah SYNC"] = (rows["Last Sync"] != "Belum Kirim").astype(int)
+    rows["Belum SYNC"] = (rows["Last Sync"] == "Belum Kirim").astype(int)
+    rows["SP_Kode"] = pd.factorize(rows["SP"])[0]
+
+    return rows
+
+
+def baseline_pivot(rows, index):
+    return rows.pivot_table(
+        values=VALUES,
+        index=index,
+        columns="Status",
+        aggfunc=BASELINE_AGGFUNC,
+        fill_value=0,
+        margins=True,
+        margins_name="Total",
+        observed=False
+    )
+
+
+def test_pivot_matches_baseline_pivot_table(page, rows):
+    cube, sp_additive = page["build_cube"](rows)
+
+    table = page["pivot_progres"](cube, rows, sp_additive, "Kecamatan", VALUES)
+    expected = baseline_pivot(rows, "Kecamatan")
+
+    for col in VALUES:
+        for status in ["Negeri", "Swasta", "Total"]:
+            assert table[(col, status)].tolist() == expected[(col, status)].tolist(), (col, status)
+
+
+def test_pivot_counts_rows_for_sync_columns(page, rows):
+    cube, sp_additive = page["build_cube"](rows)
+
+    table = page["pivot_progres"](
+        cube, rows, sp_additive, "Kecamatan", ["SP", "Sudah SYNC", "Belum SYNC"]
+    )
+
+    # Seperti aggfunc "count": jumlah baris, bukan jumlah yang sudah/belum SYNC
+    assert table[("SP", "Total")].tolist() == [3, 2, 5]
+    assert table[("Sudah SYNC", "Total")].tolist() == [3, 2, 5]
+    assert table[("Belum SYNC", "Total")].tolist() == [3, 2, 5]
+
+
+def test_pivot_jenjang_slice_matches_baseline(page, rows):
+    cube, sp_additive = page["build_cube"](rows)
+
+    table = page["pivot_progres"](
+        cube, rows, sp_additive, "Kecamatan", VALUES, jenjang="SMP"
+    )
+
+    smp = rows.loc[rows["BP"] == "SMP"].copy()
+    smp["Kecamatan"] = smp["Kecamatan"].cat.remove_unused_categories()
+    expected = baseline_pivot(smp, "Kecamatan")
+
+    assert table.index.tolist() == ["Kec B", "Total"]
+    for col in VALUES:
+        assert table[(col, "Total")].tolist() == expected[(col, "Total")].tolist(), col
+
+
+def test_pivot_duplicate_npsn_matches_baseline(page, rows):
+    # SP 1 juga tercatat di Kec B (Swasta), SP 4 dua kali di sel yang sama
+    extra = rows.iloc[[0, 3]].astype({"Kecamatan": str, "BP": str, "Status": str})
+    extra["Kecamatan"] = ["Kec B", "Kec B"]
+    extra["BP"] = ["SMP", "SMP"]
+    extra["Status"] = ["Swasta", "Negeri"]
+
+    rows = pd.concat([rows.astype({"Kecamatan": str, "BP": str, "Status": str}), extra], ignore_index=True)
+    for col in ["Kecamatan", "BP", "Status"]:
+        rows[col] = rows[col].astype("category")
+    rows["SP_Kode"] = pd.factorize(rows["SP"])[0]
+
+    cube, sp_additive = page["build_cube"](rows)
+    assert not sp_additive
+
+    for index in ["Kecamatan", "BP"]:
+        table = page["pivot_progres"](cube, rows, sp_additive, index, VALUES)
+        expected = baseline_pivot(rows, index)
+
+        for col in VALUES:
+            for status in ["Negeri", "Swasta", "Total"]:
+                assert table[(col, status)].tolist() == expected[(col, status)].tolist(), (index, col, status)
@@ -0,0 +1,185 @@
+import io
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import pytest
+
+from progres_common import filter_index, select_positions
+
+from rekap_report import (
+    build_cube,
+    MEASURES,
+    REPORT_SPECS,
+    aggregate_tables,
+    materialize_reports,
+    render_kecamatan_report,
+)
+
+
+def prepare_rows(rows):
+    for col in ["BP", "Status", "Kecamatan"]:
+        rows[col] = rows[col].astype("category")
+
+    rows["Belum_SYNC"] = rows["Last Sync"].eq("belum kirim")
+    rows["Sudah_SYNC"] = ~rows["Belum_SYNC"]
+    rows["Jml_GTK"] = rows["Guru"] + rows["Tendik"]
+    rows["NPSN_Kode"] = pd.factorize(rows["NPSN"])[0]
+
+    return rows
+
+
+def kecamatan_rows(kecamatan):
+    return prepare_rows(pd.DataFrame({
+        "NPSN": ["1", "2", "3"],
+        "BP": ["SD", "SD", "SMP"],
+        "Status": ["NEGERI", "SWASTA", "NEGERI"],
+        "Kecamatan": [kecamatan] * 3,
+        "Last Sync": ["2025-01-02", "belum kirim", "2025-01-03"],
+        "PD": [100, 50, 200],
+        "Rombel": [6, 3, 9],
+        "Guru": [10, 5, 20],
+        "Tendik": [2, 1, 4],
+    }))
+
+
+def test_render_kecamatan_report_runs_in_process_pool():
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        futures = [
+            executor.submit(render_kecamatan_report, kecamatan_rows(kecamatan))
+            for kecamatan in ["Kec A", "Kec B"]
+        ]
+        results = [future.result() for future in futures]
+
+    for excel_bytes, pdf_bytes in results:
+        assert zipfile.is_zipfile(io.BytesIO(excel_bytes))
+        assert pdf_bytes.startswith(b"%PDF")
+
+
+def master_rows():
+    """Kec A: SD + SMP, Kec B: SMP saja (tanpa Swasta)"""
+    return prepare_rows(pd.DataFrame({
+        "NPSN": ["1", "2", "3", "4", "5", "6"],
+        "BP": ["SD", "SD", "SMP", "SMP", "SMP", "SMP"],
+        "Status": ["NEGERI", "SWASTA", "NEGERI", "SWASTA", "NEGERI", "NEGERI"],
+        "Kecamatan": ["Kec A", "Kec A", "Kec A", "Kec A", "Kec B", "Kec B"],
+        "Last Sync": ["2025-01-02", "belum kirim", "2025-01-03", "2025-01-04", "belum kirim", "2025-01-05"],
+        "PD": [100, 50, 200, 80, 120, 90],
+        "Rombel": [6, 3, 9, 4, 6, 5],
+        "Guru": [10, 5, 20, 8, 12, 9],
+        "Tendik": [2, 1, 4, 2, 3, 2],
+    }))
+
+
+def baseline_table(rows, spec):
+    """Satu groupby per measure langsung dari baris, seperti sebelum cube"""
+    if spec["jenjang"] is not None:
+        rows = rows.loc[rows["BP"] == spec["jenjang"]]
+
+    key = spec["key"]
+    keys = rows[key].cat.remove_unused_categories()
+    table = {}
+
+    for measure in spec["columns"]:
+        base, status = MEASURES[measure]
+        part = rows if status is None else rows.loc[rows["Status"] == status]
+        grouped = part.groupby(keys[part.index], observed=False)
+
+        if base == "SP":
+            values = grouped["NPSN"].nunique()
+        else:
+            values = grouped[base].sum()
+
+        table[measure] = values.astype("int64")
+
+    return pd.DataFrame(table).rename_axis(key).reset_index()
+
+
+def assert_matches_baseline(rows):
+    tables = aggregate_tables(rows, REPORT_SPECS)
+
+    for name, spec in REPORT_SPECS.items():
+        result = tables[name].reset_index(drop=True)
+        expected = baseline_table(rows, spec)
+
+        assert result[spec["key"]].astype(str).tolist() == expected[spec["key"]].astype(str).tolist(), name
+        for measure in spec["columns"]:
+            assert result[measure].astype("int64").tolist() == expected[measure].tolist(), (name, measure)
+
+
+def test_aggregate_tables_matches_baseline_groupby():
+    assert_matches_baseline(master_rows())
+
+
+def test_total_row_sums_every_measure():
+    rows = master_rows()
+    reports = materialize_reports(aggregate_tables(rows, REPORT_SPECS))
+
+    total = reports["per_kec"].iloc[-1]
+    assert total["Kecamatan"] == "TOTAL"
+    assert total["SP"] == 6
+    assert total["Sudah_SYNC"] == 4
+    assert total["Belum_SYNC"] == 2
+    assert total["PD"] == rows["PD"].sum()
+    assert total["Jml_GTK"] == rows["Jml_GTK"].sum()
+
+
+def test_duplicate_npsn_counted_once_per_group():
+    # NPSN 1 terdaftar di dua sel (Kec A SD Negeri, Kec B SMP Swasta),
+    # NPSN 3 dua kali di sel yang sama
+    rows = pd.concat([
+        master_rows(),
+        prepare_rows(pd.DataFrame({
+            "NPSN": ["1", "3"],
+            "BP": ["SMP", "SMP"],
+            "Status": ["SWASTA", "NEGERI"],
+            "Kecamatan": ["Kec B", "Kec A"],
+            "Last Sync": ["2025-01-06", "2025-01-07"],
+            "PD": [30, 10],
+            "Rombel": [2, 1],
+            "Guru": [3, 1],
+            "Tendik": [1, 1],
+        })),
+    ], ignore_index=True)
+    rows = prepare_rows(rows)
+
+    _, sp_additive = build_cube(rows)
+    assert not sp_additive
+
+    assert_matches_baseline(rows)
+
+    total = materialize_reports(aggregate_tables(rows, REPORT_SPECS))["per_kec"].iloc[-1]
+    assert total["SP"] == 7
+
+
+@pytest.mark.parametrize("selection", [
+    {"Kecamatan": ["Kec A"]},
+    {"BP": ["SMP"], "Status": ["NEGERI"]},
+    {"Kecamatan": ["Kec A", "Kec B"], "BP": ["SD"]},
+    {"Kecamatan": [], "BP": ["SMP"], "Status": ["SWASTA", "NEGERI"]},
+])
+def test_filtered_view_matches_boolean_mask(selection):
+    rows = master_rows()
+
+    positions = select_positions(filter_index(rows), selection)
+    view = rows.take(positions)
+
+    mask = pd.Series(True, index=rows.index)
+    for column, values in selection.items():
+        if values:
+            mask &= rows[column].isin(values)
+    expected = rows.loc[mask]
+
+    pd.testing.assert_frame_equal(view, expected)
+
+    tables = aggregate_tables(view, REPORT_SPECS)
+    expected_tables = aggregate_tables(expected, REPORT_SPECS)
+    for name in REPORT_SPECS:
+        pd.testing.assert_frame_equal(tables[name], expected_tables[name], check_names=False)
+
+    assert_matches_baseline(view)
+
+
+def test_empty_selection_keeps_all_rows():
+    rows = master_rows()
+    assert select_positions(filter_index(rows), {"Kecamatan": [], "BP": []}) is None